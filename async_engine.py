@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+
+class AsyncCheckEngine:
+    def __init__(self, monitor, max_concurrent_checks=10, max_per_host=2):
+        self.monitor = monitor
+        self.max_concurrent_checks = max_concurrent_checks
+        self.max_per_host = max_per_host
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_checks,
+            thread_name_prefix="site-check"
+        )
+        self.global_semaphore = asyncio.Semaphore(max_concurrent_checks)
+        self.host_semaphores = {}
+        # Checks submitted from the run loop that haven't been collected yet
+        self.pending = set()
+        # The loop runs on its own thread so checks keep going while the run loop handles finished ones
+        self.thread = threading.Thread(target=self.loop.run_forever, name="check-engine", daemon=True)
+        self.thread.start()
+
+    def get_host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self.host_semaphores[host]
+
+    def start_group(self, site_configs):
+        return asyncio.run_coroutine_threadsafe(self._check_group(site_configs), self.loop)
+
+    def submit(self, site_configs):
+        # Starts a group's check as soon as a slot is free; its results come back through collect()
+        self.pending.add(self.start_group(site_configs))
+
+    def in_flight(self):
+        return len(self.pending)
+
+    def wait(self, timeout=None):
+        # Returns once any submitted check has finished, or after timeout
+        if not self.pending:
+            return False
+        done, _ = wait(self.pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        return bool(done)
+
+    def collect(self):
+        done = [future for future in self.pending if future.done()]
+        self.pending.difference_update(done)
+        return [result for future in done for result in future.result()]
+
+    def check_groups(self, groups):
+        # Checks the groups and waits for all of them, results are flattened back to one entry per site
+        futures = [self.start_group(site_configs) for site_configs in groups]
+        return [result for future in futures for result in future.result()]
+
+    async def _check_group(self, site_configs):
+        # Wait for the host slot first so a busy host doesn't hold global slots
+        async with self.get_host_semaphore(site_configs[0]["url"]):
+            async with self.global_semaphore:
+                try:
+                    return await self.loop.run_in_executor(
+                        self.executor, self.monitor.check_group, site_configs
+                    )
+                except Exception as e:
+                    # Every site still needs a result, or it would never be rescheduled
+                    logging.error(f"Unexpected error checking {site_configs[0]['url']}: {e}")
+                    return [(site_config, False, None) for site_config in site_configs]
+
+    async def _cancel_all(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        # Checks still waiting for a slot are dropped, the ones already running finish first
+        asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.executor.shutdown(wait=True)
+        self.loop.close()
+        self.pending.clear()
@@ -0,0 +1,65 @@
+import argparse
+import difflib
+import random
+import string
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from diff_engine import compute_diff, render_diff_html, render_diff_text
+
+WORDS = ["".join(random.Random(i).choices(string.ascii_lowercase, k=3 + i % 7)) for i in range(3000)]
+
+
+def random_text(size):
+    lines = []
+    length = 0
+    while length < size:
+        line = " ".join(random.choice(WORDS) for _ in range(random.randint(4, 14)))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def edit(text, edits):
+    words = text.split(" ")
+    for _ in range(edits):
+        index = random.randrange(len(words))
+        words[index] = random.choice(WORDS).upper()
+    return " ".join(words)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff latency on large monitored elements")
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[10, 100, 1024])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", action="store_true", help="also time difflib.unified_diff over the lines")
+    args = parser.parse_args()
+
+    random.seed(1)
+    for size_kb in args.size_kb:
+        old = random_text(size_kb * 1024)
+        cases = [
+            ("1 edit", edit(old, 1)),
+            ("50 edits", edit(old, 50)),
+            ("rewritten", random_text(size_kb * 1024))
+        ]
+        for label, new in cases:
+            elapsed, diff = timed(lambda: compute_diff(old, new), args.repeat)
+            render, _ = timed(lambda: (render_diff_text(diff), render_diff_html(diff)), args.repeat)
+            line = (f"{size_kb:>5} KB {label:<10}  diff {elapsed * 1000:8.2f} ms  render {render * 1000:6.2f} ms  "
+                    f"mode {diff['mode']:<7}  {len(diff['hunks']):>3} hunk(s)")
+            if args.baseline:
+                baseline, _ = timed(lambda: list(difflib.unified_diff(old.splitlines(), new.splitlines())), 1)
+                line += f"  unified_diff {baseline * 1000:9.2f} ms"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from common import make_monitor, sample_page, start_stub_server
+
+
+def build_sites(servers, site_count):
+    sites = []
+    for i in range(site_count):
+        host, port = servers[i % len(servers)].server_address
+        sites.append({
+            "id": f"site-{i}",
+            "url": f"http://{host}:{port}/page/{i}",
+            "css_selector": ".ticket-availability",
+            # The element is at the top of the sample page, early stop would only measure the first chunk
+            "early_stop": False
+        })
+    return sites
+
+
+def measure(monitor, sites):
+    start = time.perf_counter()
+    monitor.check_sites(sites)
+    return len(sites) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs async check engine throughput")
+    parser.add_argument("--sites", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub server response delay in seconds")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-host", type=int, default=8)
+    args = parser.parse_args()
+
+    servers = [start_stub_server(sample_page(), delay=args.delay) for _ in range(args.hosts)]
+    sites = build_sites(servers, args.sites)
+
+    monitor = make_monitor({
+        "sites": sites,
+        "concurrency": {
+            "enabled": True,
+            "max_concurrent_checks": args.concurrency,
+            "max_per_host": args.per_host
+        }
+    })
+
+    # Prime the state so both runs do the same "no change" work
+    monitor.check_sites(sites)
+
+    engine = monitor.engine
+    monitor.engine = None
+    sequential = measure(monitor, sites)
+    monitor.engine = engine
+    concurrent = measure(monitor, sites)
+    engine.close()
+
+    print(f"sites={args.sites} hosts={args.hosts} delay={args.delay * 1000:.0f}ms "
+          f"concurrency={args.concurrency} per_host={args.per_host}")
+    print(f"sequential: {sequential:8.1f} sites/s")
+    print(f"async:      {concurrent:8.1f} sites/s ({concurrent / sequential:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
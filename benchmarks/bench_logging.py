@@ -0,0 +1,43 @@
+import argparse
+import logging
+import time
+
+from common import make_monitor
+
+
+def measure(log_config, messages):
+    monitor = make_monitor({"sites": [], "logging": dict(log_config, console_enabled=False, level="INFO")})
+    site = {"id": "site-1", "name": "Site 1", "url": "https://example.com/tickets"}
+
+    start = time.perf_counter()
+    for i in range(messages):
+        logging.info(f"Checking site: {site['name']} ({site['url']})", extra={"site_id": site["id"]})
+        logging.info(f"Next check for {site['name']} in {i % 10 + 5:.2f} minutes", extra={"site_id": site["id"]})
+    on_check_path = time.perf_counter() - start
+
+    monitor.stop_logging()
+    total = time.perf_counter() - start
+    monitor.shutdown()
+    return on_check_path, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging cost on the check path, synchronous handlers versus the queue listener")
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    modes = [
+        ("sync text", {}),
+        ("sync json", {"format": "json"}),
+        ("async text", {"async": True}),
+        ("async json", {"async": True, "format": "json"}),
+        ("async json, no limits", {"async": True, "format": "json", "rate_limits": []}),
+    ]
+    for label, log_config in modes:
+        on_check_path, total = measure(log_config, args.messages)
+        per_record = on_check_path / (2 * args.messages) * 1e6
+        print(f"{label:<24} {per_record:7.2f} us/record on the check path  ({total:6.2f} s until written)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import glob
+import os
+import statistics
+import time
+import tracemalloc
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from html_parsing import PARSERS, compile_selector, parse_document
+
+DEFAULT_SELECTORS = [".ticket-availability", "#footer-status", "regex:row-42\\b"]
+
+
+def generate_page(rows):
+    cells = "".join(f'<li class="cell">{j}</li>' for j in range(5))
+    body = "\n".join(
+        f'<div class="row row-{i}"><a href="/item/{i}">Item {i}</a><ul>{cells}</ul></div>'
+        for i in range(rows)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Generated</title></head>
+<body>
+<div class="ticket-availability">Sold out</div>
+{body}
+<p id="footer-status">Updated</p>
+</body></html>"""
+
+
+def load_corpus(corpus_dir):
+    if corpus_dir:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(corpus_dir, "*.htm*"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages[os.path.basename(path)] = f.read()
+        return pages
+    return {f"generated-{rows}-rows": generate_page(rows) for rows in (2_000, 10_000)}
+
+
+def select(soup, selector):
+    element = selector.select(soup)
+    return element.get_text().strip() if element is not None else None
+
+
+def measure(markup, parser, css_selector, partial, repeat):
+    selector = compile_selector(css_selector)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = select(parse_document(markup, parser, selector, partial), selector)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    soup = parse_document(markup, parser, selector, partial)
+    select(soup, selector)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del soup
+    return statistics.median(timings), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser backend latency and peak memory")
+    parser.add_argument("--corpus", help="directory of saved .html pages (generated pages when omitted)")
+    parser.add_argument("--selectors", nargs="+", default=DEFAULT_SELECTORS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    modes = [(name, False) for name in PARSERS] + [("html.parser", True), ("lxml", True)]
+
+    for page_name, markup in load_corpus(args.corpus).items():
+        print(f"\n{page_name} ({len(markup) / 1024 / 1024:.1f} MB)")
+        for selector in args.selectors:
+            print(f"  selector {selector!r}")
+            for name, partial in modes:
+                latency, peak, result = measure(markup, name, selector, partial, args.repeat)
+                label = f"{name}{' (partial)' if partial else ''}"
+                print(f"    {label:<22} {latency * 1000:9.1f} ms  peak {peak / 1024 / 1024:7.1f} MB  -> {result!r}")
+
+
+if __name__ == "__main__":
+    main()
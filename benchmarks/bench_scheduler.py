@@ -0,0 +1,71 @@
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from scheduler import CheckScheduler
+
+
+def build_sites(count):
+    return [
+        {"id": f"site-{i}", "name": f"Site {i}", "min_check_interval_minutes": 5, "max_check_interval_minutes": 10}
+        for i in range(count)
+    ]
+
+
+def linear_tick(sites, next_checks, now):
+    # Mirrors the old run loop: scan every site, min() over all, then look the name up again
+    due = [site for site in sites if now >= next_checks[site["id"]]]
+    for site in due:
+        next_checks[site["id"]] = now + random.uniform(5, 10) * 60
+    next_site_id = min(next_checks, key=next_checks.get)
+    min(next_checks.values())
+    next((site.get("name", site["id"]) for site in sites if site["id"] == next_site_id), next_site_id)
+    return len(due)
+
+
+def heap_tick(scheduler, now):
+    due = scheduler.pop_due(now)
+    for site in due:
+        scheduler.reschedule(site["id"], now)
+    scheduler.next_due()
+    scheduler.peek()
+    return len(due)
+
+
+def run(count, ticks):
+    sites = build_sites(count)
+    start_time = 1_000_000.0
+    step = 600.0 / ticks
+
+    next_checks = {site["id"]: start_time + random.uniform(0, 600) for site in sites}
+    scheduler = CheckScheduler()
+    for site in sites:
+        scheduler.add_site(site, due=next_checks[site["id"]])
+
+    start = time.perf_counter()
+    linear_checks = sum(linear_tick(sites, next_checks, start_time + i * step) for i in range(ticks))
+    linear_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    heap_checks = sum(heap_tick(scheduler, start_time + i * step) for i in range(ticks))
+    heap_elapsed = time.perf_counter() - start
+
+    print(f"{count:>7} sites, {ticks} ticks")
+    print(f"  linear scan: {linear_elapsed / ticks * 1e6:10.1f} us/tick  ({linear_checks} checks)")
+    print(f"  heap:        {heap_elapsed / ticks * 1e6:10.1f} us/tick  ({heap_checks} checks)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduling overhead per wake-up")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(1)
+    for count in args.sizes:
+        run(count, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import re
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from bs4 import BeautifulSoup
+from html_parsing import compile_selector
+
+
+def legacy_find_element_by_selector(soup, css_selector):
+    # The previous implementation: CSS attempt, then re.compile and find_all() on every call
+    try:
+        element = soup.select_one(css_selector)
+        if element:
+            return element
+    except Exception:
+        pass
+
+    if css_selector.startswith('regex:'):
+        compiled_regex = re.compile(css_selector[6:])
+        for element in soup.find_all():
+            if element.get('class'):
+                if compiled_regex.search(' '.join(element.get('class'))):
+                    return element
+    return None
+
+
+def generate_page(elements):
+    rows = "".join(
+        f'<div class="item item-{i} card"><span class="label">{i}</span></div>'
+        for i in range(elements // 2)
+    )
+    return f'<html><body>{rows}<p class="Status_target-x1">Sold out</p></body></html>'
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Selector matching cost on a large page")
+    parser.add_argument("--elements", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    soup = BeautifulSoup(generate_page(args.elements), "lxml")
+    print(f"{len(soup.find_all())} elements")
+
+    for css_selector in ("regex:Status_target", "regex:item-24999\\b", ".Status_target-x1"):
+        selector = compile_selector(css_selector)
+        legacy, legacy_result = timed(lambda: legacy_find_element_by_selector(soup, css_selector), args.repeat)
+        compiled, compiled_result = timed(lambda: selector.select(soup), args.repeat)
+        assert legacy_result is compiled_result
+        print(f"{css_selector!r:<24} legacy {legacy * 1000:8.1f} ms   compiled {compiled * 1000:8.1f} ms   "
+              f"({legacy / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
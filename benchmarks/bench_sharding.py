@@ -0,0 +1,76 @@
+import argparse
+import multiprocessing
+import time
+
+from common import make_monitor, sample_page, start_stub_server
+
+
+def worker(config, shards, rounds, ready, start, results):
+    monitor = make_monitor(config, shards=shards)
+    sites = monitor.config["sites"]
+    # Prime the state so every timed round parses and compares without saving initial content
+    monitor.check_sites(sites)
+
+    ready.release()
+    start.wait()
+    began = time.perf_counter()
+    for _ in range(rounds):
+        monitor.check_sites(sites)
+    results.put((len(sites) * rounds, time.perf_counter() - began))
+
+
+def measure(context, config, workers, rounds):
+    ready = context.Semaphore(0)
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(config, [(0, 1), (index, workers)], rounds, ready, start, results))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    start.set()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    pages = sum(count for count, _ in outcomes)
+    slowest = max(elapsed for _, elapsed in outcomes)
+    return pages, pages / slowest, [count // rounds for count, _ in outcomes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse throughput with the sites sharded across worker processes")
+    parser.add_argument("--sites", type=int, default=64)
+    parser.add_argument("--elements", type=int, default=5000, help="elements per page, sets the parse cost")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--parser", default="html.parser")
+    args = parser.parse_args()
+
+    server = start_stub_server(sample_page(args.elements))
+    host, port = server.server_address
+    config = {
+        "sites": [
+            {"id": f"site-{i}", "url": f"http://{host}:{port}/page/{i}", "css_selector": ".ticket-availability",
+             "early_stop": False}
+            for i in range(args.sites)
+        ],
+        "parser": args.parser
+    }
+
+    context = multiprocessing.get_context("spawn")
+    print(f"sites={args.sites} elements={args.elements} parser={args.parser} cpus={multiprocessing.cpu_count()}")
+
+    baseline = None
+    for workers in args.workers:
+        pages, rate, split = measure(context, config, workers, args.rounds)
+        baseline = baseline or rate
+        print(f"{workers:>3} worker(s): {rate:8.1f} pages/s ({rate / baseline:4.1f}x)  sites per worker {split}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+import mail_notification
+from smtp_sink import SMTPSink
+
+
+def build_changes(count):
+    return [
+        {
+            "site_id": f"site-{i}",
+            "site_name": f"Site {i}",
+            "url": f"https://example.com/tickets/{i}",
+            "old": "Sold out",
+            "new": "Available",
+            "recipients": None
+        }
+        for i in range(count)
+    ]
+
+
+def run(sink, changes, keep_alive, batched):
+    mail_notification.close_connections()
+    mail_notification._connection_managers.clear()
+    config = {"email": sink.email_config(keep_alive=keep_alive)}
+    connections_before = sink.connections
+
+    start = time.perf_counter()
+    if batched:
+        mail_notification.send_email_notifications(changes, config)
+    else:
+        for change_info in changes:
+            mail_notification.send_email_notification(change_info, config)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sink.connections - connections_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification burst over one SMTP connection versus one per message")
+    parser.add_argument("--changes", type=int, default=40)
+    parser.add_argument("--connect-delay", type=float, default=0.05, help="simulated handshake/login cost in seconds")
+    args = parser.parse_args()
+
+    sink = SMTPSink(connect_delay=args.connect_delay).start()
+    changes = build_changes(args.changes)
+
+    for label, keep_alive, batched in (("connection per message", False, False), ("pooled burst", True, True)):
+        elapsed, connections = run(sink, changes, keep_alive, batched)
+        print(f"{label:<24} {elapsed * 1000:8.1f} ms  {connections:3d} connection(s)")
+
+
+if __name__ == "__main__":
+    main()
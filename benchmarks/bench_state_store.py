@@ -0,0 +1,68 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from state_store import JsonStateStore, SQLiteStateStore
+
+
+def make_state(i, check):
+    return {
+        "content": f"Tickets for show {i}: {'available' if check % 2 else 'sold out'}",
+        "last_check": "2026-01-01T12:00:00",
+        "etag": f'"{i}-{check}"',
+        "last_modified": None,
+        "stats": {"checks": check, "not_modified": 0, "body_hash_checks": 0, "body_hash_hits": 0}
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def write_all(store, site_ids, check):
+    for i, site_id in enumerate(site_ids):
+        store.save(site_id, make_state(i, check))
+    store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="State backend startup and write cost")
+    parser.add_argument("--sites", type=int, default=10_000)
+    args = parser.parse_args()
+
+    site_ids = [f"site-{i}" for i in range(args.sites)]
+    workdir = tempfile.mkdtemp(prefix="state-bench-")
+    json_dir = os.path.join(workdir, "json")
+    os.makedirs(json_dir)
+
+    try:
+        json_store = JsonStateStore(json_dir)
+        json_write, _ = timed(lambda: write_all(json_store, site_ids, 1))
+        json_load, states = timed(lambda: json_store.load_all(site_ids))
+        assert len(states) == args.sites
+
+        db_path = os.path.join(workdir, "state.db")
+        migrate, sqlite_store = timed(lambda: SQLiteStateStore(db_path, data_dir=json_dir))
+        sqlite_write, _ = timed(lambda: write_all(sqlite_store, site_ids, 2))
+        sqlite_store.close()
+
+        sqlite_store = SQLiteStateStore(db_path, data_dir=json_dir)
+        sqlite_load, states = timed(lambda: sqlite_store.load_all(site_ids))
+        assert len(states) == args.sites and states["site-0"]["stats"]["checks"] == 2
+        sqlite_store.close()
+
+        print(f"{args.sites} sites")
+        print(f"  json   startup load {json_load * 1000:8.1f} ms   write {json_write / args.sites * 1e6:7.1f} us/check")
+        print(f"  sqlite startup load {sqlite_load * 1000:8.1f} ms   write {sqlite_write / args.sites * 1e6:7.1f} us/check")
+        print(f"  one-time migration of the JSON files: {migrate * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
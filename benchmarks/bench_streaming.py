@@ -0,0 +1,60 @@
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from common import make_monitor, start_stub_server
+
+
+def generate_page(size_mb, element_at_top):
+    row = '<div class="row"><a href="/item">Item</a><span>filler text for the page body</span></div>\n'
+    rows = row * (size_mb * 1024 * 1024 // len(row))
+    element = '<div class="ticket-availability">Sold out</div>\n'
+    if element_at_top:
+        return f"<!DOCTYPE html><html><body>\n{element}{rows}</body></html>"
+    return f"<!DOCTYPE html><html><body>\n{rows}{element}</body></html>"
+
+
+def measure(url, early_stop, repeat):
+    site = {"id": "site", "url": url, "css_selector": ".ticket-availability", "early_stop": early_stop,
+            "parser": "lxml", "max_body_bytes": 1024 * 1024 * 1024}
+    monitor = make_monitor({"sites": [site]})
+
+    timings = []
+    for _ in range(repeat):
+        monitor.site_states.clear()
+        start = time.perf_counter()
+        monitor.check_website(site)
+        timings.append(time.perf_counter() - start)
+
+    monitor.site_states.clear()
+    tracemalloc.start()
+    monitor.check_website(site)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    content = monitor.site_states["site"]["content"]
+    monitor.shutdown()
+    return statistics.median(timings), peak, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check latency and peak memory on large pages, full download versus early stop")
+    parser.add_argument("--size-mb", type=int, nargs="+", default=[2, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for size_mb in args.size_mb:
+        for element_at_top in (True, False):
+            server = start_stub_server(generate_page(size_mb, element_at_top))
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            print(f"\n{size_mb} MB page, element at the {'top' if element_at_top else 'bottom'}")
+            for early_stop in (False, True):
+                latency, peak, content = measure(url, early_stop, args.repeat)
+                label = "early stop" if early_stop else "full download"
+                print(f"  {label:<14} {latency * 1000:9.1f} ms  peak {peak / 1024 / 1024:7.1f} MB  -> {content!r}")
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
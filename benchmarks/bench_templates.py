@@ -0,0 +1,87 @@
+import argparse
+import html
+import os
+import random
+import string
+import time
+
+import common  # noqa: F401  (puts the project root on sys.path)
+from email_templates import TEMPLATE_DIR
+from diff_engine import compute_diff
+from mail_notification import build_email_message, diff_values, render_change
+
+
+def random_text(size):
+    words = ["ticket", "available", "sold", "out", "<b>VIP</b>", "row", "seat", "&", "price", "42"]
+    parts = []
+    length = 0
+    while length < size:
+        word = random.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def uncompiled_render(change_info):
+    # Read and substitute the templates on every call, like rebuilding the f-string per notification
+    with open(os.path.join(TEMPLATE_DIR, "email.css"), encoding="utf-8") as f:
+        style = f.read()
+    diff = diff_values(change_info)
+    values = {
+        "site_name": html.escape(change_info["site_name"]),
+        "url": html.escape(change_info["url"]),
+        "display_url": html.escape(change_info["url"][:37]),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "year": time.localtime().tm_year,
+        "new": html.escape(change_info["new"]),
+        "old": html.escape(change_info["old"]),
+        "diff": diff["diff"],
+        "diff_html": diff["diff_html"],
+        "diff_summary": html.escape(diff["diff_summary"]),
+        "style": style
+    }
+    results = []
+    for name in ("change.html", "change.txt"):
+        with open(os.path.join(TEMPLATE_DIR, name), encoding="utf-8") as f:
+            results.append(string.Template(f.read()).substitute(values))
+    return results
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Email render cost per notification")
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[1, 20, 200])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(1)
+    config = {"email": {"sender": "monitor@example.com", "recipients": ["alerts@example.com"]}}
+
+    for size_kb in args.size_kb:
+        change_info = {
+            "site_id": "bench",
+            "site_name": "Benchmark Site",
+            "url": "https://example.com/tickets/event-with-a-long-url",
+            "old": random_text(size_kb * 1024),
+            "new": random_text(size_kb * 1024),
+            "recipients": None
+        }
+        # The monitor computes the diff once when it detects the change, not per render
+        change_info["diff"] = compute_diff(change_info["old"], change_info["new"])
+        render_change(change_info)
+
+        uncompiled = timed(lambda: uncompiled_render(change_info), args.repeat)
+        compiled = timed(lambda: render_change(change_info), args.repeat)
+        full = timed(lambda: build_email_message(change_info, config), args.repeat)
+        print(f"{size_kb:>4} KB payload  uncompiled {uncompiled * 1000:7.2f} ms   precompiled {compiled * 1000:7.2f} ms   "
+              f"with MIME encoding {full * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
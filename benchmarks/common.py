@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Clients that stop reading early (streaming checks) hang up mid-body
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(body, delay=0.0, handler=StubHandler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.body = body.encode("utf-8") if isinstance(body, str) else body
+    server.delay = delay
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_monitor(config, **kwargs):
+    from website_listener import WebsiteMonitor
+
+    workdir = tempfile.mkdtemp(prefix="website-monitor-bench-")
+    os.chdir(workdir)
+    config.setdefault("logging", {"console_enabled": False, "level": "WARNING"})
+    with open("config.json", "w") as f:
+        json.dump(config, f)
+    return WebsiteMonitor("config.json", **kwargs)
+
+
+def sample_page(elements=200):
+    rows = "\n".join(
+        f'<div class="row row-{i}"><span class="label">Item {i}</span></div>'
+        for i in range(elements)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Stub</title></head>
+<body>
+<div class="ticket-availability">Sold out</div>
+{rows}
+</body></html>"""
@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROFILES = ("normal", "slow", "throttled", "large", "changing", "flapping")
+
+
+class FleetSite:
+    def __init__(self, index, profile, phase=0.0):
+        self.index = index
+        self.profile = profile
+        # Spreads changes and flaps so the whole fleet doesn't switch in the same second
+        self.phase = phase
+
+    def version(self, fleet, now):
+        if self.profile != "changing":
+            return 0
+        return max(0, int((now - fleet.started - self.phase) // fleet.change_period))
+
+    def changed_at(self, fleet, version):
+        return fleet.started + self.phase + version * fleet.change_period
+
+    def is_down(self, fleet, now):
+        return self.profile == "flapping" and int((now - fleet.started - self.phase) // fleet.flap_period) % 2 == 1
+
+
+class FleetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        fleet = self.server.fleet
+        try:
+            index = int(self.path.strip("/").split("/")[-1])
+            site = fleet.sites[index]
+        except (ValueError, IndexError):
+            self.respond(404, b"unknown site")
+            return
+
+        now = time.time()
+        if site.profile == "slow":
+            time.sleep(fleet.slow_delay)
+        if site.profile == "throttled" and fleet.random() < fleet.throttle_rate:
+            self.respond(429, b"slow down", {"Retry-After": str(fleet.retry_after)})
+            return
+        if site.is_down(fleet, now):
+            self.respond(500, b"down")
+            return
+
+        version = site.version(fleet, now)
+        etag = f'"{site.index}-{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.respond(304, b"", {"ETag": etag})
+            return
+        self.respond(200, fleet.page(site, version), {"ETag": etag, "Content-Type": "text/html; charset=utf-8"})
+
+    def respond(self, status, body, headers=None):
+        self.server.fleet.record(status, len(body))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Fleet:
+    def __init__(self, site_count, hosts=10, mix=None, seed=1, slow_delay=2.0, throttle_rate=0.5,
+                 retry_after=30, large_kb=512, change_period=60.0, flap_period=45.0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.slow_delay = slow_delay
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.large_kb = large_kb
+        self.change_period = change_period
+        self.flap_period = flap_period
+        self.started = time.time()
+        self.requests = 0
+        self.statuses = {}
+        self.bytes_sent = 0
+
+        # mix maps profile to the fraction of the fleet using it, the rest are normal pages
+        mix = mix or {}
+        profiles = []
+        for profile in PROFILES[1:]:
+            profiles.extend([profile] * int(round(site_count * mix.get(profile, 0))))
+        profiles.extend(["normal"] * (site_count - len(profiles)))
+        self.rng.shuffle(profiles)
+        self.sites = [
+            FleetSite(index, profile, self.rng.uniform(0, change_period if profile == "changing" else flap_period))
+            for index, profile in enumerate(profiles[:site_count])
+        ]
+
+        row = '<div class="row"><a href="/item">Item</a><span>filler text for a large page</span></div>\n'
+        self.large_filler = row * (large_kb * 1024 // len(row))
+        self.servers = [self.create_server() for _ in range(hosts)]
+
+    def create_server(self):
+        # One port per simulated host, so per-host limits and backoff apply like they would in production
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FleetHandler)
+        server.daemon_threads = True
+        server.fleet = self
+        return server
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def record(self, status, size):
+        with self.lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def snapshot(self):
+        with self.lock:
+            return {"requests": self.requests, "statuses": dict(self.statuses), "bytes_sent": self.bytes_sent}
+
+    def url(self, site):
+        host, port = self.servers[site.index % len(self.servers)].server_address
+        return f"http://{host}:{port}/site/{site.index}"
+
+    def page(self, site, version):
+        # The rev token lets the harness match a notification to the change that caused it
+        element = f'<div class="status">Site {site.index} rev-{site.index}-{version}</div>'
+        filler = self.large_filler if site.profile == "large" else ""
+        return f"<!DOCTYPE html><html><head><title>Site {site.index}</title></head><body>\n{filler}{element}\n</body></html>".encode("utf-8")
+
+    def start(self):
+        self.started = time.time()
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
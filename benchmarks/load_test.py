@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import re
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from common import ROOT_DIR
+from fleet_server import Fleet
+from smtp_sink import SMTPSink
+
+REV_PATTERN = re.compile(r"rev-(\d+)-(\d+)")
+SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# Metric name -> True when higher is better, used to decide what counts as a regression
+DIRECTIONS = {
+    "checks_per_second": True,
+    "requests_per_second": True,
+    "schedule_drift_p50_seconds": False,
+    "schedule_drift_p99_seconds": False,
+    "check_latency_p50_seconds": False,
+    "check_latency_p99_seconds": False,
+    "cpu_percent": False,
+    "cpu_seconds_per_check": False,
+    "peak_rss_mb": False,
+    "notification_latency_p50_seconds": False,
+    "notification_latency_p99_seconds": False,
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_config(fleet, sink, args, metrics_port):
+    sites = [
+        {
+            "id": f"site-{site.index}",
+            "name": f"Site {site.index} ({site.profile})",
+            "url": fleet.url(site),
+            "css_selector": ".status",
+            "min_check_interval_minutes": args.interval_minutes,
+            "max_check_interval_minutes": args.interval_minutes * 1.5
+        }
+        for site in fleet.sites
+    ]
+    return {
+        "sites": sites,
+        "email": sink.email_config(),
+        "concurrency": {"enabled": args.concurrency > 0, "max_concurrent_checks": max(1, args.concurrency), "max_per_host": args.max_per_host},
+        "state": {"backend": "sqlite"},
+        "scheduling": {"warmup_seconds": args.warmup},
+        "metrics": {"enabled": True, "port": metrics_port, "per_site": False},
+        "config_reload": {"enabled": False},
+        "logging": {"console_enabled": False, "level": "WARNING"}
+    }
+
+
+def scrape(ports):
+    # Sums the samples of every endpoint, sharded workers each serve their own
+    samples = {}
+    for port in ports:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                text = response.read().decode("utf-8")
+        except OSError:
+            continue
+        for line in text.splitlines():
+            match = SAMPLE_PATTERN.match(line)
+            if line.startswith("#") or not match:
+                continue
+            name, labels, value = match.groups()
+            key = (name, tuple(sorted(LABEL_PATTERN.findall(labels or ""))))
+            samples[key] = samples.get(key, 0.0) + float(value)
+    return samples
+
+
+def wait_for_metrics(ports, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"monitor exited with code {process.returncode} during startup")
+        if scrape(ports):
+            return
+        time.sleep(0.5)
+    raise RuntimeError("metrics endpoint did not come up")
+
+
+def counter_delta(before, after, name, label=None):
+    totals = {}
+    for (sample_name, labels), value in after.items():
+        if sample_name != name:
+            continue
+        key = dict(labels).get(label) if label else None
+        totals[key] = totals.get(key, 0.0) + value - before.get((sample_name, labels), 0.0)
+    return totals
+
+
+def histogram_quantile(before, after, name, quantile):
+    # Same estimate as Prometheus' histogram_quantile: linear interpolation inside the bucket
+    buckets = counter_delta(before, after, f"{name}_bucket", "le")
+    bounds = sorted((float(le), count) for le, count in buckets.items())
+    if not bounds or bounds[-1][1] <= 0:
+        return None
+    rank = quantile * bounds[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in bounds:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def percentile(values, quantile):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(quantile * len(values)))]
+
+
+def message_text(message):
+    parts = []
+    for part in message.walk():
+        payload = part.get_payload(decode=True)
+        if payload:
+            parts.append(payload.decode(part.get_content_charset() or "utf-8", "replace"))
+    return "\n".join(parts)
+
+
+def notification_latencies(fleet, messages, start, end):
+    latencies = []
+    for received, message in messages:
+        if not start <= received <= end:
+            continue
+        revisions = {}
+        for index, version in REV_PATTERN.findall(message_text(message)):
+            index, version = int(index), int(version)
+            revisions[index] = max(revisions.get(index, 0), version)
+        for index, version in revisions.items():
+            site = fleet.sites[index]
+            # Only changing sites have a known change time, flapping recoveries carry the unchanged revision
+            if site.profile == "changing" and version > 0:
+                latencies.append(received - site.changed_at(fleet, version))
+    return latencies
+
+
+def rusage_children():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return usage.ru_utime + usage.ru_stime, rss_mb
+
+
+def run(args):
+    mix = {
+        "slow": args.slow, "throttled": args.throttled, "large": args.large,
+        "changing": args.changing, "flapping": args.flapping
+    }
+    fleet = Fleet(
+        args.sites, hosts=args.hosts, mix=mix, seed=args.seed, slow_delay=args.slow_delay,
+        throttle_rate=args.throttle_rate, large_kb=args.large_kb,
+        change_period=args.change_period, flap_period=args.flap_period
+    ).start()
+    sink = SMTPSink().start()
+
+    workdir = tempfile.mkdtemp(prefix="website-monitor-load-")
+    metrics_port = free_port()
+    ports = [metrics_port] if args.workers <= 1 else [metrics_port + i + 1 for i in range(args.workers)]
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(build_config(fleet, sink, args, metrics_port), f, indent=2)
+
+    command = [sys.executable, os.path.join(ROOT_DIR, "website_listener.py"), "--config", "config.json", "--workers", str(args.workers)]
+    with open(os.path.join(workdir, "monitor.out"), "w") as output:
+        process = subprocess.Popen(command, cwd=workdir, stdout=output, stderr=subprocess.STDOUT)
+    try:
+        wait_for_metrics(ports, process)
+        print(f"Monitor started with {args.sites} sites on {args.hosts} hosts, warming up for {args.warmup:.0f}s")
+        time.sleep(args.warmup)
+
+        start = time.time()
+        metrics_before = scrape(ports)
+        fleet_before = fleet.snapshot()
+        print(f"Measuring for {args.duration:.0f}s")
+        time.sleep(args.duration)
+        end = time.time()
+        metrics_after = scrape(ports)
+        fleet_after = fleet.snapshot()
+    finally:
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        fleet.stop()
+        sink.shutdown()
+
+    elapsed = end - start
+    cpu_seconds, peak_rss_mb = rusage_children()
+    checks_by_result = {result: int(count) for result, count in counter_delta(metrics_before, metrics_after, "website_monitor_checks_total", "result").items()}
+    checks = sum(count for result, count in checks_by_result.items() if result != "deferred")
+    latencies = notification_latencies(fleet, sink.messages, start, end)
+
+    results = {
+        "checks_per_second": checks / elapsed,
+        "requests_per_second": (fleet_after["requests"] - fleet_before["requests"]) / elapsed,
+        "schedule_drift_p50_seconds": histogram_quantile(metrics_before, metrics_after, "website_monitor_scheduler_lag_seconds", 0.5),
+        "schedule_drift_p99_seconds": histogram_quantile(metrics_before, metrics_after, "website_monitor_scheduler_lag_seconds", 0.99),
+        "check_latency_p50_seconds": histogram_quantile(metrics_before, metrics_after, "website_monitor_check_seconds", 0.5),
+        "check_latency_p99_seconds": histogram_quantile(metrics_before, metrics_after, "website_monitor_check_seconds", 0.99),
+        # CPU covers the whole run including startup, the monitor is the only child process
+        "cpu_percent": 100 * cpu_seconds / (time.time() - fleet.started),
+        "cpu_seconds_per_check": cpu_seconds / checks if checks else None,
+        "peak_rss_mb": peak_rss_mb,
+        "notification_latency_p50_seconds": percentile(latencies, 0.5),
+        "notification_latency_p99_seconds": percentile(latencies, 0.99),
+        "notifications": len(latencies),
+        "checks_by_result": checks_by_result,
+        "http_statuses": {
+            str(status): count - fleet_before["statuses"].get(status, 0)
+            for status, count in fleet_after["statuses"].items()
+            if count > fleet_before["statuses"].get(status, 0)
+        }
+    }
+
+    if args.keep_dir:
+        print(f"Monitor files kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    params = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance", "keep_dir")}
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": params, "results": results}
+
+
+def compare(baseline, current, tolerance):
+    if baseline.get("params") != current["params"]:
+        print("Warning: the baseline was recorded with different parameters")
+
+    regressions = []
+    print(f"\n{'metric':<36} {'baseline':>12} {'current':>12} {'change':>9}")
+    for metric, higher_is_better in DIRECTIONS.items():
+        old = baseline["results"].get(metric)
+        new = current["results"].get(metric)
+        if old is None or new is None:
+            print(f"{metric:<36} {str(old):>12} {str(new):>12}")
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<36} {old:12.4f} {new:12.4f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def print_results(results):
+    print()
+    for metric in DIRECTIONS:
+        value = results[metric]
+        print(f"{metric:<36} {value:12.4f}" if value is not None else f"{metric:<36} {'n/a':>12}")
+    print(f"{'notifications':<36} {results['notifications']:12d}")
+    print(f"checks by result: {results['checks_by_result']}")
+    print(f"HTTP statuses:    {results['http_statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the monitor against a simulated fleet and record a performance baseline")
+    parser.add_argument("--sites", type=int, default=1000)
+    parser.add_argument("--hosts", type=int, default=20, help="number of simulated hosts (one local port each)")
+    parser.add_argument("--duration", type=float, default=120, help="measured seconds, after the warm-up")
+    parser.add_argument("--warmup", type=float, default=30, help="seconds before measuring, also used as the monitor's warmup_seconds")
+    parser.add_argument("--interval-minutes", type=float, default=1.0, help="minimum check interval per site, the maximum is 1.5x")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=20, help="max_concurrent_checks for the async engine, 0 checks sequentially")
+    parser.add_argument("--max-per-host", type=int, default=4)
+    parser.add_argument("--slow", type=float, default=0.05, help="fraction of slow responders")
+    parser.add_argument("--slow-delay", type=float, default=2.0)
+    parser.add_argument("--throttled", type=float, default=0.02, help="fraction of sites that answer 429")
+    parser.add_argument("--throttle-rate", type=float, default=0.5, help="share of requests a throttled site answers with 429")
+    parser.add_argument("--large", type=float, default=0.02, help="fraction of large pages")
+    parser.add_argument("--large-kb", type=int, default=512)
+    parser.add_argument("--changing", type=float, default=0.1, help="fraction of sites whose content changes periodically")
+    parser.add_argument("--change-period", type=float, default=60.0)
+    parser.add_argument("--flapping", type=float, default=0.02, help="fraction of sites alternating between up and HTTP 500")
+    parser.add_argument("--flap-period", type=float, default=45.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON, e.g. a baseline to compare against later")
+    parser.add_argument("--compare", help="baseline JSON to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change that counts as a regression")
+    parser.add_argument("--keep-dir", action="store_true", help="keep the monitor's working directory and output")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_results(report["results"])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import socket
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.open_sockets.add(self.connection)
+        try:
+            self.serve()
+        finally:
+            with server.lock:
+                server.open_sockets.discard(self.connection)
+
+    def serve(self):
+        server = self.server
+        if server.connect_delay:
+            time.sleep(server.connect_delay)
+
+        self.reply("220 smtp-sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip().upper()
+
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 smtp-sink")
+            elif command.startswith("NOOP"):
+                with server.lock:
+                    server.noops += 1
+                self.reply("250 OK")
+            elif command.startswith(("MAIL", "RCPT", "RSET")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.read_data()
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+        message = message_from_bytes(b"".join(lines))
+        with self.server.lock:
+            self.server.messages.append((time.time(), message))
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), connect_delay=0.0):
+        super().__init__(address, SMTPSinkHandler)
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.noops = 0
+        self.messages = []
+        self.open_sockets = set()
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def drop_connections(self):
+        # Simulates the server or a middlebox closing idle connections without a QUIT
+        with self.lock:
+            sockets = list(self.open_sockets)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def email_config(self, **overrides):
+        host, port = self.server_address
+        config = {
+            "enabled": True,
+            "smtp_server": host,
+            "smtp_port": port,
+            "smtp_username": "",
+            "smtp_password": "",
+            "sender": "monitor@example.com",
+            "recipients": ["alerts@example.com"],
+            "use_tls": False,
+            "use_ssl": False
+        }
+        config.update(overrides)
+        return config
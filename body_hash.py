@@ -0,0 +1,51 @@
+import hashlib
+import re
+
+DEFAULT_NORMALIZE_PATTERNS = [
+    r'nonce="[^"]*"',
+    r'name="csrf[^"]*"\s+(?:content|value)="[^"]*"',
+    r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?',
+    r'\b\d{10}(?:\d{3})?\b'
+]
+
+_compiled_patterns = {}
+
+
+def get_body_hash_config(option):
+    if isinstance(option, dict):
+        config = dict(option)
+        config.setdefault("enabled", True)
+    else:
+        config = {"enabled": bool(option)}
+
+    patterns = config.get("normalize_patterns")
+    if patterns is None and config.get("normalize", False):
+        patterns = DEFAULT_NORMALIZE_PATTERNS
+    config["normalize_patterns"] = patterns or []
+    return config
+
+
+def compile_patterns(patterns):
+    key = tuple(patterns)
+    if key not in _compiled_patterns:
+        _compiled_patterns[key] = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+    return _compiled_patterns[key]
+
+
+def fast_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def compute_body_hashes(body, text, normalize_patterns):
+    hashes = {"body_hash": fast_hash(body), "normalized_body_hash": None}
+    if normalize_patterns:
+        normalized = compile_patterns(normalize_patterns).sub("", text)
+        hashes["normalized_body_hash"] = fast_hash(normalized.encode("utf-8"))
+    return hashes
+
+
+def hashes_match(previous_state, hashes):
+    if previous_state.get("body_hash") == hashes["body_hash"]:
+        return True
+    normalized = hashes["normalized_body_hash"]
+    return normalized is not None and previous_state.get("normalized_body_hash") == normalized
@@ -0,0 +1,310 @@
+import argparse
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from content_cache import content_digest
+
+TOKEN_PATTERN = re.compile(r"(\s+)")
+
+
+def tokenize(text):
+    # Splitting on whitespace but keeping it means "".join(tokens) == text
+    return [token for token in TOKEN_PATTERN.split(text) if token]
+
+
+def encode_delta(base, content):
+    base_tokens = tokenize(base)
+    tokens = tokenize(content)
+    ops = []
+    matcher = SequenceMatcher(None, base_tokens, tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(tokens[j1:j2]))
+    return zlib.compress(json.dumps(ops).encode("utf-8"))
+
+
+def apply_delta(base, payload):
+    base_tokens = tokenize(base)
+    parts = []
+    for op in json.loads(zlib.decompress(payload).decode("utf-8")):
+        if isinstance(op, list):
+            parts.append("".join(base_tokens[op[0]:op[1]]))
+        else:
+            parts.append(op)
+    return "".join(parts)
+
+
+def encode_snapshot(content):
+    return zlib.compress(content.encode("utf-8"))
+
+
+def decode_snapshot(payload):
+    return zlib.decompress(payload).decode("utf-8")
+
+
+class ChangeHistory:
+    def __init__(self, path, snapshot_interval=20, max_versions=None, max_age_days=None, cache_content=True):
+        self.path = path
+        # Without the cached head content, a change rebuilds the previous version from the database
+        self.cache_content = cache_content
+        self.snapshot_interval = snapshot_interval
+        self.max_versions = max_versions
+        self.max_age_days = max_age_days
+        self.lock = threading.RLock()
+        self.heads = {}
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS versions ("
+                "site_id TEXT NOT NULL, version INTEGER NOT NULL, recorded_at REAL NOT NULL, "
+                "kind TEXT NOT NULL, payload BLOB NOT NULL, size INTEGER NOT NULL, "
+                "PRIMARY KEY (site_id, version))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS versions_by_time ON versions (site_id, recorded_at)"
+            )
+
+    def _head(self, site_id):
+        head = self.heads.get(site_id)
+        if head is None:
+            row = self.connection.execute(
+                "SELECT MAX(version) FROM versions WHERE site_id = ?", (site_id,)
+            ).fetchone()
+            if row[0] is None:
+                head = {"version": 0, "content": None, "digest": None, "since_snapshot": 0}
+            else:
+                snapshot = self.connection.execute(
+                    "SELECT MAX(version) FROM versions WHERE site_id = ? AND kind = 'snapshot'", (site_id,)
+                ).fetchone()[0]
+                content = self.rebuild(site_id, row[0])
+                head = {
+                    "version": row[0],
+                    "content": content if self.cache_content else None,
+                    "digest": content_digest(content) if content is not None else None,
+                    "since_snapshot": row[0] - snapshot
+                }
+            self.heads[site_id] = head
+        return head
+
+    def record(self, site_id, content, recorded_at=None):
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        content = "" if content is None else content
+
+        with self.lock:
+            head = self._head(site_id)
+            digest = content_digest(content)
+            if head["digest"] == digest:
+                return head["version"]
+
+            version = head["version"] + 1
+            snapshot = encode_snapshot(content)
+            kind, payload = "snapshot", snapshot
+            if head["version"] and head["since_snapshot"] + 1 < self.snapshot_interval:
+                base = head["content"] if head["content"] is not None else self.rebuild(site_id, head["version"])
+                if base is not None:
+                    delta = encode_delta(base, content)
+                    if len(delta) < len(snapshot):
+                        kind, payload = "delta", delta
+
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO versions (site_id, version, recorded_at, kind, payload, size) VALUES (?, ?, ?, ?, ?, ?)",
+                    (site_id, version, recorded_at, kind, payload, len(content))
+                )
+
+            head.update(
+                version=version,
+                content=content if self.cache_content else None,
+                digest=digest,
+                since_snapshot=0 if kind == "snapshot" else head["since_snapshot"] + 1
+            )
+
+            if (self.max_versions or self.max_age_days) and version % self.snapshot_interval == 0:
+                self.compact(site_id)
+            return version
+
+    def rebuild(self, site_id, version):
+        with self.lock:
+            start = self.connection.execute(
+                "SELECT MAX(version) FROM versions WHERE site_id = ? AND version <= ? AND kind = 'snapshot'",
+                (site_id, version)
+            ).fetchone()[0]
+            if start is None:
+                return None
+
+            rows = self.connection.execute(
+                "SELECT version, kind, payload FROM versions WHERE site_id = ? AND version BETWEEN ? AND ? ORDER BY version",
+                (site_id, start, version)
+            ).fetchall()
+
+        if not rows or rows[-1][0] != version:
+            return None
+
+        content = None
+        for _, kind, payload in rows:
+            content = decode_snapshot(payload) if kind == "snapshot" else apply_delta(content, payload)
+        return content
+
+    def get_version(self, site_id, version):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT version, recorded_at FROM versions WHERE site_id = ? AND version = ?", (site_id, version)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"version": row[0], "recorded_at": row[1], "content": self.rebuild(site_id, row[0])}
+
+    def get_version_at(self, site_id, timestamp):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT MAX(version) FROM versions WHERE site_id = ? AND recorded_at <= ?", (site_id, timestamp)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return self.get_version(site_id, row[0])
+
+    def list_changes(self, site_id, since=None, until=None):
+        query = "SELECT version, recorded_at, kind, size, length(payload) FROM versions WHERE site_id = ?"
+        params = [site_id]
+        if since is not None:
+            query += " AND recorded_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND recorded_at <= ?"
+            params.append(until)
+        query += " ORDER BY version"
+
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [
+            {"version": version, "recorded_at": recorded_at, "kind": kind, "size": size, "stored_bytes": stored}
+            for version, recorded_at, kind, size, stored in rows
+        ]
+
+    def site_ids(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT DISTINCT site_id FROM versions ORDER BY site_id")]
+
+    def compact(self, site_id=None):
+        if site_id is None:
+            return sum(self.compact(site) for site in self.site_ids())
+
+        with self.lock:
+            versions = [row[0] for row in self.connection.execute(
+                "SELECT version FROM versions WHERE site_id = ? ORDER BY version", (site_id,)
+            )]
+            if not versions:
+                return 0
+
+            keep_from = versions[0]
+            if self.max_versions and len(versions) > self.max_versions:
+                keep_from = versions[-self.max_versions]
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                newest_expired = self.connection.execute(
+                    "SELECT MAX(version) FROM versions WHERE site_id = ? AND recorded_at < ?", (site_id, cutoff)
+                ).fetchone()[0]
+                # Always keep the latest version, even when it is older than the cutoff
+                if newest_expired is not None:
+                    keep_from = max(keep_from, min(newest_expired + 1, versions[-1]))
+
+            if keep_from == versions[0]:
+                return 0
+
+            # The oldest kept version must be a snapshot so the deltas after it can still be rebuilt
+            content = self.rebuild(site_id, keep_from)
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE versions SET kind = 'snapshot', payload = ? WHERE site_id = ? AND version = ?",
+                    (encode_snapshot(content), site_id, keep_from)
+                )
+                removed = self.connection.execute(
+                    "DELETE FROM versions WHERE site_id = ? AND version < ?", (site_id, keep_from)
+                ).rowcount
+
+        if removed:
+            logging.info(f"Compacted change history for {site_id}: removed {removed} old version(s)")
+        return removed
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the website monitor change history")
+    parser.add_argument("--db", default="monitor_data/history.db", help="path to the history database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="list recorded versions of a site")
+    list_parser.add_argument("site_id")
+    list_parser.add_argument("--since", help="ISO date/time, e.g. 2024-05-01T00:00")
+    list_parser.add_argument("--until", help="ISO date/time")
+
+    show_parser = commands.add_parser("show", help="print the content of one version")
+    show_parser.add_argument("site_id")
+    target = show_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--version", type=int)
+    target.add_argument("--at", help="ISO date/time, shows the version that was current at that moment")
+
+    compact_parser = commands.add_parser("compact", help="apply retention limits and drop old versions")
+    compact_parser.add_argument("site_id", nargs="?")
+    compact_parser.add_argument("--max-versions", type=int)
+    compact_parser.add_argument("--max-age-days", type=float)
+
+    commands.add_parser("sites", help="list sites with recorded history")
+
+    args = parser.parse_args()
+    history = ChangeHistory(
+        args.db,
+        max_versions=getattr(args, "max_versions", None),
+        max_age_days=getattr(args, "max_age_days", None)
+    )
+
+    try:
+        if args.command == "list":
+            for change in history.list_changes(args.site_id, parse_time(args.since), parse_time(args.until)):
+                print(f"{change['version']:>6}  {format_time(change['recorded_at'])}  {change['kind']:<8}  "
+                      f"{change['size']:>8} chars  {change['stored_bytes']:>7} bytes stored")
+        elif args.command == "show":
+            if args.version is not None:
+                version = history.get_version(args.site_id, args.version)
+            else:
+                version = history.get_version_at(args.site_id, parse_time(args.at))
+            if version is None:
+                print("No matching version found")
+                return 1
+            print(f"# {args.site_id} version {version['version']} recorded {format_time(version['recorded_at'])}")
+            print(version["content"])
+        elif args.command == "compact":
+            removed = history.compact(args.site_id)
+            print(f"Removed {removed} version(s)")
+        elif args.command == "sites":
+            for site_id in history.site_ids():
+                print(site_id)
+    finally:
+        history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
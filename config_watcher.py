@@ -0,0 +1,54 @@
+import json
+import logging
+import os
+import time
+
+
+class ConfigWatcher:
+    def __init__(self, path, interval=5):
+        self.path = path
+        self.interval = interval
+        self.signature = self.read_signature()
+        self.next_check = time.time() + interval
+
+    def read_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self, now=None):
+        now = time.time() if now is None else now
+        if now < self.next_check:
+            return None
+        self.next_check = now + self.interval
+
+        signature = self.read_signature()
+        if signature is None or signature == self.signature:
+            return None
+        # Remember the signature even if loading fails, a half-saved file is retried once it changes again
+        self.signature = signature
+
+        try:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+            validate_config(config)
+        except (OSError, ValueError) as e:
+            logging.error(f"Ignoring changed configuration in {self.path}: {e}")
+            return None
+        return config
+
+
+def validate_config(config):
+    if not isinstance(config, dict) or not isinstance(config.get("sites"), list):
+        raise ValueError("configuration must contain a list of sites")
+
+    seen = set()
+    for site_config in config["sites"]:
+        for key in ("id", "url", "css_selector"):
+            if key not in site_config:
+                raise ValueError(f"site {site_config.get('id', '?')} is missing '{key}'")
+        if site_config["id"] in seen:
+            raise ValueError(f"duplicate site id '{site_config['id']}'")
+        seen.add(site_config["id"])
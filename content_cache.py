@@ -0,0 +1,59 @@
+import hashlib
+import zlib
+
+DEFAULT_MEMORY_CONFIG = {
+    "enabled": False,
+    "max_inline_chars": 4096,
+    "max_cached_bytes": 16384,
+    "compress": True,
+    "release_parse_trees": True,
+    "max_notification_chars": 20000,
+    "trace_top": 10,
+    "trace_frames": 1
+}
+
+
+def get_memory_config(value):
+    config = dict(DEFAULT_MEMORY_CONFIG)
+    config.update(value or {})
+    return config
+
+
+def content_digest(content):
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CachedContent:
+    # Stands in for a large content in memory: a digest to compare against, plus a copy only if it fits the cap
+    __slots__ = ("digest", "length", "data", "compressed")
+
+    def __init__(self, content, max_bytes, compress=True):
+        encoded = content.encode("utf-8")
+        self.digest = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+        self.length = len(content)
+        data = zlib.compress(encoded) if compress else encoded
+        self.compressed = compress
+        self.data = data if len(data) <= max_bytes else None
+
+    def matches(self, content):
+        if isinstance(content, CachedContent):
+            return content.digest == self.digest
+        return content is not None and len(content) == self.length and content_digest(content) == self.digest
+
+    def text(self):
+        if self.data is None:
+            return None
+        data = zlib.decompress(self.data) if self.compressed else self.data
+        return data.decode("utf-8")
+
+
+def compact_content(content, memory_config):
+    if not isinstance(content, str) or len(content) <= memory_config["max_inline_chars"]:
+        return content
+    return CachedContent(content, memory_config["max_cached_bytes"], memory_config["compress"])
+
+
+def truncate_content(content, max_chars):
+    if content is None or not max_chars or len(content) <= max_chars:
+        return content
+    return f"{content[:max_chars]}\n… [{len(content) - max_chars} more characters not shown]"
@@ -0,0 +1,197 @@
+import html
+import re
+from difflib import SequenceMatcher
+
+WORD_PATTERN = re.compile(r"\S+\s*|\s+")
+
+DEFAULT_OPTIONS = {
+    "mode": "auto",
+    "context_words": 6,
+    "context_lines": 1,
+    "max_input_chars": 2_000_000,
+    "max_lines": 50_000,
+    "max_words": 2_000,
+    "max_output_chars": 4000
+}
+
+
+def tokenize_words(text):
+    # Each token carries its trailing whitespace, so "".join(tokens) == text
+    return WORD_PATTERN.findall(text)
+
+
+def tokenize_lines(text):
+    return text.splitlines(keepends=True)
+
+
+def changed_blocks(a, b, max_tokens):
+    # Trimming the shared prefix and suffix first keeps small edits cheap on huge inputs
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+
+    a_end = len(a) - suffix
+    b_end = len(b) - suffix
+    if (a_end - prefix) + (b_end - prefix) > max_tokens:
+        return None
+
+    matcher = SequenceMatcher(None, a[prefix:a_end], b[prefix:b_end], autojunk=False)
+    return [
+        (prefix + i1, prefix + i2, prefix + j1, prefix + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    ]
+
+
+def summarize(old, new, reason):
+    return {
+        "mode": "summary",
+        "hunks": [],
+        "added": 0,
+        "removed": 0,
+        "truncated": True,
+        "summary": f"Content changed from {len(old)} to {len(new)} characters ({reason})"
+    }
+
+
+def compute_diff(old, new, options=None):
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    old = old or ""
+    new = new or ""
+
+    if max(len(old), len(new)) > options["max_input_chars"]:
+        return summarize(old, new, "too large to diff")
+
+    old_lines = tokenize_lines(old)
+    new_lines = tokenize_lines(new)
+    blocks = changed_blocks(old_lines, new_lines, options["max_lines"])
+    if blocks is None:
+        return summarize(old, new, "too many changed lines to diff")
+
+    hunks = []
+    for i1, i2, j1, j2 in blocks:
+        word_hunks = None
+        if options["mode"] != "line":
+            word_hunks = _word_hunks(old_lines, new_lines, i1, i2, j1, j2, options)
+        hunks.extend(word_hunks if word_hunks is not None else [_line_hunk(old_lines, new_lines, i1, i2, j1, j2, options)])
+
+    return _finish(hunks, options)
+
+
+def _word_hunks(old_lines, new_lines, i1, i2, j1, j2, options):
+    # Refine a block of changed lines to the words that actually differ
+    old_words = tokenize_words("".join(old_lines[i1:i2]))
+    new_words = tokenize_words("".join(new_lines[j1:j2]))
+    blocks = changed_blocks(old_words, new_words, options["max_words"])
+    if blocks is None:
+        return None
+
+    context = options["context_words"]
+    hunks = []
+    for w1, w2, v1, v2 in blocks:
+        start = max(0, w1 - context)
+        hunks.append({
+            "kind": "word",
+            "before": "".join(old_words[start:w1]),
+            "removed": "".join(old_words[w1:w2]),
+            "added": "".join(new_words[v1:v2]),
+            "after": "".join(old_words[w2:w2 + context]),
+            "more_before": start > 0 or i1 > 0,
+            "more_after": w2 + context < len(old_words) or i2 < len(old_lines)
+        })
+    return hunks
+
+
+def _line_hunk(old_lines, new_lines, i1, i2, j1, j2, options):
+    context = options["context_lines"]
+    start = max(0, i1 - context)
+    return {
+        "kind": "line",
+        "before": "".join(old_lines[start:i1]),
+        "removed": "".join(old_lines[i1:i2]),
+        "added": "".join(new_lines[j1:j2]),
+        "after": "".join(old_lines[i2:i2 + context]),
+        "more_before": start > 0,
+        "more_after": i2 + context < len(old_lines)
+    }
+
+
+def _finish(hunks, options):
+    max_output_chars = options["max_output_chars"]
+    added = sum(len(hunk["added"].split()) for hunk in hunks)
+    removed = sum(len(hunk["removed"].split()) for hunk in hunks)
+
+    shown = []
+    output_chars = 0
+    truncated = False
+    for hunk in hunks:
+        size = sum(len(hunk[key]) for key in ("before", "removed", "added", "after"))
+        if shown and output_chars + size > max_output_chars:
+            truncated = True
+            break
+        if size > max_output_chars:
+            hunk = dict(hunk, removed=_clip(hunk["removed"], max_output_chars // 2),
+                        added=_clip(hunk["added"], max_output_chars // 2))
+            truncated = True
+        shown.append(hunk)
+        output_chars += size
+
+    summary = f"{len(hunks)} change(s): {added} word(s) added, {removed} word(s) removed"
+    if truncated:
+        summary += f", showing the first {len(shown)}"
+
+    return {
+        "mode": "line" if any(hunk["kind"] == "line" for hunk in hunks) else "word",
+        "hunks": shown,
+        "added": added,
+        "removed": removed,
+        "truncated": truncated,
+        "summary": summary
+    }
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit] + " …"
+
+
+def _flatten(text):
+    return " ".join(text.split())
+
+
+def render_diff_text(diff):
+    lines = [diff["summary"]]
+    for hunk in diff["hunks"]:
+        lines.append("")
+        before = _flatten(hunk["before"])
+        if before:
+            lines.append(f"  {'…' if hunk['more_before'] else ''}{before}")
+        lines.extend(f"- {line.strip()}" for line in hunk["removed"].strip().splitlines())
+        lines.extend(f"+ {line.strip()}" for line in hunk["added"].strip().splitlines())
+        after = _flatten(hunk["after"])
+        if after:
+            lines.append(f"  {after}{'…' if hunk['more_after'] else ''}")
+    return "\n".join(lines)
+
+
+def render_diff_html(diff):
+    parts = [f'<p class="diff-summary">{html.escape(diff["summary"])}</p>']
+    for hunk in diff["hunks"]:
+        before = _flatten(hunk["before"])
+        after = _flatten(hunk["after"])
+        removed = hunk["removed"].strip()
+        added = hunk["added"].strip()
+
+        parts.append('<div class="diff-hunk">')
+        if before:
+            parts.append(f'<span class="diff-context">{"…" if hunk["more_before"] else ""}{html.escape(before)} </span>')
+        if removed:
+            parts.append(f'<del class="diff-removed">{html.escape(removed)}</del> ')
+        if added:
+            parts.append(f'<ins class="diff-added">{html.escape(added)}</ins>')
+        if after:
+            parts.append(f'<span class="diff-context"> {html.escape(after)}{"…" if hunk["more_after"] else ""}</span>')
+        parts.append('</div>')
+    return "".join(parts)
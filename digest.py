@@ -0,0 +1,93 @@
+import threading
+import time
+
+
+class DigestBuffer:
+    def __init__(self):
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def add(self, change_info, recipients, window_seconds, now=None):
+        now = time.time() if now is None else now
+        key = tuple(recipients)
+
+        with self.lock:
+            group = self.groups.get(key)
+            if group is None:
+                group = {"recipients": list(recipients), "flush_at": now + window_seconds, "sites": {}}
+                self.groups[key] = group
+            # A site with a shorter window pulls the whole group's delivery forward
+            group["flush_at"] = min(group["flush_at"], now + window_seconds)
+
+            site_id = change_info["site_id"]
+            entry = group["sites"].get(site_id)
+            if entry is None:
+                entry = {
+                    "site_id": site_id,
+                    "site_name": change_info["site_name"],
+                    "url": change_info["url"],
+                    "changes": [],
+                    "flaps": 0
+                }
+                group["sites"][site_id] = entry
+
+            self._add_change(entry, change_info, now)
+
+    @staticmethod
+    def _add_change(entry, change_info, now):
+        changes = entry["changes"]
+        new_content = change_info["new"]
+
+        if changes and new_content == changes[0]["old"]:
+            # A -> ... -> A within the window is no net change
+            entry["changes"] = []
+            entry["flaps"] += 1
+            return
+
+        for index, change in enumerate(changes):
+            if change["new"] == new_content:
+                # Back to a value already reported in this window, drop the detour
+                del changes[index + 1:]
+                entry["flaps"] += 1
+                return
+
+        changes.append({"old": change_info["old"], "new": new_content, "diff": change_info.get("diff"), "time": now})
+
+    def next_flush(self):
+        with self.lock:
+            if not self.groups:
+                return None
+            return min(group["flush_at"] for group in self.groups.values())
+
+    def pop_due(self, now=None, flush_all=False):
+        now = time.time() if now is None else now
+        digests = []
+
+        with self.lock:
+            for key in list(self.groups):
+                group = self.groups[key]
+                if not flush_all and group["flush_at"] > now:
+                    continue
+                del self.groups[key]
+
+                sites = [entry for entry in group["sites"].values() if entry["changes"]]
+                if sites:
+                    digests.append(build_digest(group["recipients"], sites))
+
+        return digests
+
+
+def build_digest(recipients, sites):
+    change_count = sum(len(site["changes"]) for site in sites)
+    latest = sites[-1]["changes"][-1]
+    return {
+        "digest": True,
+        "site_id": ",".join(site["site_id"] for site in sites),
+        "site_name": sites[0]["site_name"] if len(sites) == 1 else f"{len(sites)} sites",
+        "url": sites[0]["url"],
+        "old": sites[0]["changes"][0]["old"],
+        "new": latest["new"],
+        "recipients": recipients,
+        "sites": sites,
+        "change_count": change_count
+    }
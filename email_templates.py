@@ -0,0 +1,107 @@
+import html
+import os
+import string
+import threading
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+DEFAULT_TEMPLATES = {
+    "html": "change.html",
+    "text": "change.txt",
+    "digest_html": "digest.html",
+    "digest_text": "digest.txt",
+    "digest_site_html": "digest_site.html",
+    "digest_site_text": "digest_site.txt",
+    "digest_change_html": "digest_change.html",
+    "digest_change_text": "digest_change.txt"
+}
+
+
+class CompiledTemplate:
+    def __init__(self, source, static_values=None, escape=False):
+        self.escape = escape
+        self.literals = []
+        self.fields = []
+
+        literal = []
+        position = 0
+        for match in string.Template.pattern.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+
+            if match.group("escaped") is not None:
+                literal.append("$")
+                continue
+
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                raise ValueError(f"Invalid placeholder in template at position {match.start()}")
+
+            # Static values (like the stylesheet) are baked in once at compile time
+            if static_values and name in static_values:
+                literal.append(static_values[name])
+                continue
+
+            self.literals.append("".join(literal))
+            self.fields.append(name)
+            literal = []
+
+        literal.append(source[position:])
+        self.literals.append("".join(literal))
+
+    def render(self, values):
+        parts = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            value = str(values[name])
+            # Fields ending in _html carry already rendered markup
+            if self.escape and not name.endswith("_html"):
+                value = html.escape(value)
+            parts.append(value)
+            parts.append(literal)
+        return "".join(parts)
+
+
+class TemplateStore:
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self.templates = {}
+        self.lock = threading.Lock()
+        self._style = None
+
+    def get_style(self):
+        if self._style is None:
+            with open(os.path.join(self.template_dir, "email.css"), 'r', encoding='utf-8') as f:
+                self._style = f.read().rstrip("\n")
+        return self._style
+
+    def resolve_path(self, name):
+        if os.path.isabs(name) or os.path.exists(name):
+            return name
+        return os.path.join(self.template_dir, name)
+
+    def get(self, name):
+        path = self.resolve_path(name)
+        template = self.templates.get(path)
+        if template is not None:
+            return template
+
+        with self.lock:
+            template = self.templates.get(path)
+            if template is None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    source = f.read()
+                is_html = path.endswith((".html", ".htm"))
+                template = CompiledTemplate(
+                    source,
+                    static_values={"style": self.get_style()} if is_html else None,
+                    escape=is_html
+                )
+                self.templates[path] = template
+        return template
+
+    def get_named(self, kind, overrides=None):
+        name = (overrides or {}).get(kind) or DEFAULT_TEMPLATES[kind]
+        return self.get(name)
+
+
+template_store = TemplateStore()
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from rate_limit import TokenBucket
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def host_key(url):
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value, now=None):
+    if not value:
+        return None
+    now = time.time() if now is None else now
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - now)
+
+
+class HostState:
+    def __init__(self, host, bucket=None):
+        self.host = host
+        self.bucket = bucket
+        self.circuit = CLOSED
+        self.failures = 0
+        self.throttles = 0
+        self.opens = 0
+        self.blocked_until = 0
+        self.probe_started = None
+        self.totals = {"requests": 0, "throttled": 0, "failures": 0, "circuit_opens": 0, "deferred": 0}
+
+
+class HostPoliteness:
+    def __init__(self, requests_per_second=None, burst=None, backoff_base=60, backoff_max=3600,
+                 failure_threshold=5, open_seconds=300, probe_timeout=120):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get_host(self, url):
+        host = host_key(url)
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None:
+                bucket = TokenBucket(self.requests_per_second, self.burst) if self.requests_per_second else None
+                state = HostState(host, bucket)
+                self.hosts[host] = state
+        return state
+
+    def before_request(self, url, now=None):
+        # Returns (allowed, retry_at); at most one half-open probe is let through at a time
+        now = time.time() if now is None else now
+        state = self.get_host(url)
+
+        with self.lock:
+            if state.circuit == OPEN:
+                if now < state.blocked_until:
+                    state.totals["deferred"] += 1
+                    return False, state.blocked_until
+                state.circuit = HALF_OPEN
+                state.probe_started = None
+                logging.info(f"Circuit for {state.host} is half-open, sending a probe request")
+
+            if state.circuit == HALF_OPEN:
+                if state.probe_started is not None and now - state.probe_started < self.probe_timeout:
+                    state.totals["deferred"] += 1
+                    return False, state.probe_started + self.probe_timeout
+                state.probe_started = now
+            elif now < state.blocked_until:
+                state.totals["deferred"] += 1
+                return False, state.blocked_until
+
+            state.totals["requests"] += 1
+            return True, None
+
+    def acquire(self, url):
+        bucket = self.get_host(url).bucket
+        return bucket.acquire() if bucket is not None else 0.0
+
+    def retry_time(self, url, now=None):
+        now = time.time() if now is None else now
+        state = self.get_host(url)
+        with self.lock:
+            return state.blocked_until if state.blocked_until > now else None
+
+    def backoff(self, count):
+        return min(self.backoff_max, self.backoff_base * 2 ** max(0, count - 1))
+
+    def record_success(self, url):
+        state = self.get_host(url)
+        with self.lock:
+            if state.circuit != CLOSED:
+                logging.info(f"Circuit for {state.host} closed, probe request succeeded")
+            state.circuit = CLOSED
+            state.failures = 0
+            state.throttles = 0
+            state.opens = 0
+            state.blocked_until = 0
+            state.probe_started = None
+
+    def record_throttle(self, url, status_code, retry_after=None, now=None):
+        now = time.time() if now is None else now
+        state = self.get_host(url)
+        with self.lock:
+            state.throttles += 1
+            state.totals["throttled"] += 1
+            delay = parse_retry_after(retry_after, now)
+            delay = min(self.backoff_max, delay) if delay is not None else self.backoff(state.throttles)
+            state.blocked_until = max(state.blocked_until, now + delay)
+            # A throttled probe proves the host is reachable, wait out the throttle instead of re-opening
+            if state.circuit == HALF_OPEN:
+                state.circuit = CLOSED
+                state.opens = 0
+            state.probe_started = None
+        logging.warning(f"Host {state.host} answered {status_code}, backing off for {delay:.0f} seconds")
+        return delay
+
+    def record_failure(self, url, error, now=None):
+        now = time.time() if now is None else now
+        state = self.get_host(url)
+        with self.lock:
+            state.failures += 1
+            state.totals["failures"] += 1
+            state.probe_started = None
+
+            if state.circuit == HALF_OPEN or state.failures >= self.failure_threshold:
+                state.opens += 1
+                state.totals["circuit_opens"] += 1
+                state.circuit = OPEN
+                delay = min(self.backoff_max, self.open_seconds * 2 ** (state.opens - 1))
+                state.blocked_until = now + delay
+                message = f"Circuit for {state.host} opened after {state.failures} failure(s) ({error}), next probe in {delay:.0f} seconds"
+            else:
+                delay = self.backoff(state.failures)
+                state.blocked_until = max(state.blocked_until, now + delay)
+                message = f"Request to {state.host} failed ({error}), backing off for {delay:.0f} seconds"
+        logging.warning(message)
+        return delay
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            return {
+                host: dict(
+                    state.totals,
+                    circuit=state.circuit,
+                    consecutive_failures=state.failures,
+                    backoff_remaining_seconds=max(0.0, state.blocked_until - now),
+                    blocked_until=datetime.fromtimestamp(state.blocked_until).isoformat() if state.blocked_until > now else None
+                )
+                for host, state in self.hosts.items()
+            }
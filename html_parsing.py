@@ -0,0 +1,252 @@
+import logging
+import re
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound, Tag
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+PARSERS = ("html.parser", "lxml", "html5lib")
+DEFAULT_PARSER = "html.parser"
+
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:([.#])([\w-]+))?$')
+
+_unavailable_parsers = set()
+
+
+def resolve_parser(parser):
+    if parser not in PARSERS:
+        logging.warning(f"Unknown parser '{parser}', falling back to {DEFAULT_PARSER}")
+        return DEFAULT_PARSER
+    if parser in _unavailable_parsers:
+        return DEFAULT_PARSER
+    return parser
+
+
+def _class_string(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return " ".join(value)
+    return " ".join(value.split())
+
+
+class CompiledSelector:
+    def __init__(self, css_selector):
+        self.css_selector = css_selector
+        self.is_regex = css_selector.startswith("regex:")
+        self.pattern = None
+        self.css = None
+        self.valid = True
+        self._strainer = None
+        self._strainer_built = False
+
+        if self.is_regex:
+            try:
+                self.pattern = re.compile(css_selector[6:])
+            except re.error as e:
+                logging.error(f"Invalid regex pattern '{css_selector[6:]}': {e}")
+                self.valid = False
+        else:
+            try:
+                self.css = soupsieve.compile(css_selector)
+            except Exception as e:
+                logging.error(f"Invalid CSS selector '{css_selector}': {e}")
+                self.valid = False
+
+    def select(self, soup):
+        if self.css is not None:
+            return self.css.select_one(soup)
+        if self.pattern is not None:
+            return self._select_by_class_regex(soup)
+        return None
+
+    def _select_by_class_regex(self, soup):
+        search = self.pattern.search
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            classes = element.attrs.get("class")
+            if not classes:
+                continue
+            # Single-class tags are the common case, only join when there are several
+            if isinstance(classes, str):
+                class_str = classes
+            elif len(classes) == 1:
+                class_str = classes[0]
+            else:
+                class_str = " ".join(classes)
+            if search(class_str):
+                return element
+        return None
+
+    @property
+    def strainer(self):
+        if not self._strainer_built:
+            self._strainer = build_strainer(self) if self.valid else None
+            self._strainer_built = True
+        return self._strainer
+
+    @property
+    def marker(self):
+        # Lowercase bytes that must appear in the page before the element can start, None when unknown
+        if self.is_regex or not self.valid:
+            return None
+        match = SIMPLE_SELECTOR.match(self.css_selector.strip())
+        if not match:
+            return None
+        tag, kind, value = match.groups()
+        if value:
+            return value.lower().encode("utf-8")
+        return f"<{tag}".lower().encode("utf-8") if tag else None
+
+    @property
+    def matcher(self):
+        # A predicate over lxml elements, only for selectors that can be decided from the start tag alone
+        if not self.valid:
+            return None
+        if self.is_regex:
+            search = self.pattern.search
+
+            def matches_class(element):
+                class_str = _class_string(element.get("class"))
+                return class_str is not None and search(class_str) is not None
+
+            return matches_class
+
+        match = SIMPLE_SELECTOR.match(self.css_selector.strip())
+        if not match or not (match.group(1) or match.group(3)):
+            return None
+        tag, kind, value = match.groups()
+        tag = tag.lower() if tag else None
+
+        def matches(element):
+            if tag is not None and element.tag != tag:
+                return False
+            if kind == ".":
+                classes = element.get("class")
+                return classes is not None and value in classes.split()
+            if kind == "#":
+                return element.get("id") == value
+            return True
+
+        return matches
+
+
+def compile_selector(css_selector):
+    return CompiledSelector(css_selector)
+
+
+def build_strainer(selector):
+    if isinstance(selector, str):
+        selector = compile_selector(selector)
+    css_selector = selector.css_selector
+
+    if selector.is_regex:
+        pattern = selector.pattern
+        if pattern is None:
+            return None
+
+        def match_class(value):
+            class_str = _class_string(value)
+            return class_str is not None and pattern.search(class_str) is not None
+
+        return SoupStrainer(class_=match_class)
+
+    match = SIMPLE_SELECTOR.match(css_selector.strip())
+    if not match or not (match.group(1) or match.group(3)):
+        return None
+
+    tag, kind, value = match.groups()
+    kwargs = {}
+    if kind == ".":
+        kwargs["class_"] = lambda classes: classes is not None and value in _class_string(classes).split(" ")
+    elif kind == "#":
+        kwargs["id"] = value
+    return SoupStrainer(tag, **kwargs)
+
+
+def parse_document(markup, parser=DEFAULT_PARSER, selector=None, partial=False):
+    parser = resolve_parser(parser)
+
+    parse_only = None
+    # html5lib always builds the whole tree, so partial parsing needs another backend
+    if partial and selector is not None and parser != "html5lib":
+        parse_only = selector.strainer
+
+    try:
+        return BeautifulSoup(markup, parser, parse_only=parse_only)
+    except FeatureNotFound:
+        logging.warning(f"Parser '{parser}' is not installed, falling back to {DEFAULT_PARSER}")
+        _unavailable_parsers.add(parser)
+        return BeautifulSoup(markup, DEFAULT_PARSER, parse_only=parse_only)
+
+
+def release_tree(soup):
+    for child in list(soup.contents):
+        child.decompose()
+
+
+class ElementWatcher:
+    # Follows a download and reports when the first match of every selector has closed
+    def __init__(self, matchers, markers=None):
+        self.matchers = list(matchers)
+        self.waiting = dict(enumerate(self.matchers))
+        self.parser = etree.HTMLPullParser(events=("start", "end"))
+        self.open = {}
+        self.done = set()
+        # Parsing only starts once one of the markers shows up, a page without them costs a substring search
+        self.markers = markers
+        self.scanned = 0
+        self.fed = 0
+
+    @classmethod
+    def create(cls, selectors):
+        if etree is None or not selectors:
+            return None
+        matchers = [selector.matcher for selector in selectors]
+        if any(matcher is None for matcher in matchers):
+            return None
+        markers = [selector.marker for selector in selectors]
+        return cls(matchers, None if None in markers else markers)
+
+    def feed(self, body):
+        # body is everything downloaded so far
+        if self.markers is not None:
+            overlap = max(len(marker) for marker in self.markers) - 1
+            window = bytes(body[max(0, self.scanned - overlap):]).lower()
+            self.scanned = len(body)
+            if not any(marker in window for marker in self.markers):
+                return False
+            self.markers = None
+
+        chunk = bytes(body[self.fed:])
+        self.fed = len(body)
+        try:
+            self.parser.feed(chunk)
+            events = list(self.parser.read_events())
+        except etree.LxmlError:
+            return False
+
+        for event, element in events:
+            if event == "start":
+                if self.waiting:
+                    for index, matches in list(self.waiting.items()):
+                        if matches(element):
+                            del self.waiting[index]
+                            self.open[index] = element
+            elif self.open:
+                for index, opened in list(self.open.items()):
+                    if opened is element:
+                        del self.open[index]
+                        self.done.add(index)
+            else:
+                # Finished elements outside any match are not needed, drop them to keep the tree small
+                element.clear()
+        return self.finished
+
+    @property
+    def finished(self):
+        return len(self.done) == len(self.matchers)
@@ -0,0 +1,105 @@
+import json
+import logging
+import random
+import re
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler
+
+from rate_limit import TokenBucket
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Per-site context passed with extra={...}, copied into JSON lines when present
+CONTEXT_FIELDS = ("site_id", "site_name", "url", "result")
+
+DEFAULT_RATE_LIMITS = [
+    {"match": "^Next check for ", "max_per_minute": 60},
+    {"match": "^Element with selector .* not found", "max_per_minute": 30}
+]
+
+
+def site_context(site_configs, result=None):
+    # A shared fetch logs once for its whole group, so ids and names become lists
+    if isinstance(site_configs, dict):
+        site_configs = [site_configs]
+    ids = [site_config["id"] for site_config in site_configs]
+    names = [site_config.get("name", site_config["id"]) for site_config in site_configs]
+    return {
+        "site_id": ids[0] if len(ids) == 1 else ids,
+        "site_name": names[0] if len(names) == 1 else names,
+        "url": site_configs[0]["url"],
+        "result": result
+    }
+
+
+def change_context(change):
+    return {"site_id": change.get("site_id"), "site_name": change.get("site_name"), "url": change.get("url"), "result": "changed"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "thread": record.threadName
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RepeatFilter(logging.Filter):
+    # Rate-limits or samples messages matching a rule; a message that gets through reports how many were dropped
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = []
+        for rule in rules:
+            try:
+                pattern = re.compile(rule["match"])
+            except (KeyError, re.error) as e:
+                logging.error(f"Ignoring log rate limit {rule}: {e}")
+                continue
+            max_per_minute = rule.get("max_per_minute")
+            bucket = TokenBucket(max_per_minute / 60, rule.get("burst", max_per_minute)) if max_per_minute else None
+            self.rules.append({"pattern": pattern, "bucket": bucket, "sample": rule.get("sample"), "suppressed": 0})
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        # The same filter sits on every handler, a record is only counted against the limits once
+        decision = getattr(record, "repeat_filter_decision", None)
+        if decision is not None:
+            return decision
+        record.repeat_filter_decision = self.decide(record)
+        return record.repeat_filter_decision
+
+    def decide(self, record):
+        if not isinstance(record.msg, str):
+            return True
+        for rule in self.rules:
+            if not rule["pattern"].search(record.msg):
+                continue
+            allowed = rule["sample"] is None or random.random() < rule["sample"]
+            if allowed and rule["bucket"] is not None:
+                allowed = rule["bucket"].try_acquire()
+            with self.lock:
+                if not allowed:
+                    rule["suppressed"] += 1
+                    return False
+                suppressed, rule["suppressed"] = rule["suppressed"], 0
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} similar message(s) suppressed)"
+            return True
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    # QueueHandler formats in the calling thread; leave the record alone so the listener formats it
+    def prepare(self, record):
+        return record
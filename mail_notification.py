@@ -2,12 +2,42 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import logging
-import smtplib
+from smtp_pool import SMTPConnectionManager
+from email_templates import template_store
+from diff_engine import compute_diff, render_diff_text, render_diff_html
+
+_connection_managers = {}
 
 def send_email_notification(change_info, config):
-    email_config = config["email"]
-    
-    site_recipients = change_info.get("recipients", [])
+    failures = send_email_notifications([change_info], config)
+    if failures:
+        raise failures[0][1]
+
+def send_email_notifications(change_infos, config):
+    messages = []
+    for change_info in change_infos:
+        message = build_email_message(change_info, config)
+        if message is not None:
+            messages.append((change_info, message))
+    
+    if not messages:
+        return []
+    
+    manager = get_connection_manager(config)
+    errors = manager.send_messages([msg for _, (msg, _) in messages])
+    
+    failures = []
+    for (change_info, (msg, recipients)), error in zip(messages, errors):
+        if error is not None:
+            failures.append((change_info, error))
+        else:
+            logging.info(f"Email notification sent to {len(recipients)} recipient(s): {', '.join(recipients)}")
+    
+    if len(messages) > 1 and len(failures) < len(messages):
+        logging.info(f"Sent {len(messages) - len(failures)} of {len(messages)} email notifications over one SMTP connection")
+    return failures
+
+def resolve_recipients(site_recipients, email_config):
     global_recipients = email_config.get("recipients", email_config.get("recipient", []))
     
     if isinstance(site_recipients, str):
@@ -21,263 +51,23 @@ def send_email_notification(change_info, config):
         global_recipients = []
     
     recipients = site_recipients if site_recipients else global_recipients
+    return list(dict.fromkeys(recipients))
+
+def build_email_message(change_info, config):
+    email_config = config["email"]
+    recipients = resolve_recipients(change_info.get("recipients", []), email_config)
     
     if not recipients:
         logging.warning("No email recipients configured")
-        return
-    
-    recipients = list(dict.fromkeys(recipients))
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    site_name = change_info["site_name"]
-    url = change_info["url"]
-    
-    display_url = url
-    if len(url) > 40:
-        display_url = url[:37] + "..."
-    
-    subject = f"🔔 Change Detected: {site_name}"
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Website Change Alert</title>
-        <style>
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-                line-height: 1.5;
-                color: #e2e8f0;
-                background-color: #0f172a;
-                margin: 0;
-                padding: 16px;
-            }}
-            
-            .container {{
-                max-width: 600px;
-                margin: 0 auto;
-                background-color: #1e293b;
-                border-radius: 8px;
-                overflow: hidden;
-                border: 1px solid #334155;
-            }}
-            
-            .header {{
-                background-color: #1e293b;
-                padding: 24px;
-                border-bottom: 1px solid #334155;
-            }}
-            
-            .header h1 {{
-                color: #f1f5f9;
-                font-size: 20px;
-                font-weight: 600;
-                margin-bottom: 4px;
-            }}
-            
-            .timestamp {{
-                color: #94a3b8;
-                font-size: 14px;
-            }}
-            
-            .content {{
-                padding: 24px;
-            }}
-            
-            .site-info {{
-                background-color: #0f172a;
-                border: 1px solid #334155;
-                border-radius: 6px;
-                padding: 16px;
-                margin-bottom: 24px;
-            }}
-            
-            .site-name {{
-                color: #f1f5f9;
-                font-size: 16px;
-                font-weight: 500;
-                margin-bottom: 8px;
-            }}
-            
-            .site-url {{
-                color: #60a5fa;
-                font-size: 14px;
-                text-decoration: none;
-                word-break: break-all;
-            }}
-            
-            .changes {{
-                margin-bottom: 24px;
-            }}
-            
-            .change-block {{
-                border: 1px solid #334155;
-                border-radius: 6px;
-                margin-bottom: 16px;
-                overflow: hidden;
-            }}
-            
-            .change-header {{
-                padding: 12px 16px;
-                font-size: 12px;
-                font-weight: 600;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }}
-            
-            .change-header.new {{
-                background-color: #166534;
-                color: #dcfce7;
-            }}
-            
-            .change-header.old {{
-                background-color: #991b1b;
-                color: #fecaca;
-            }}
-            
-            .change-content {{
-                padding: 16px;
-                font-size: 14px;
-                line-height: 1.6;
-                word-break: break-word;
-            }}
-            
-            .change-content.new {{
-                background-color: #0f172a;
-                color: #dcfce7;
-                border-left: 3px solid #22c55e;
-            }}
-            
-            .change-content.old {{
-                background-color: #0f172a;
-                color: #fecaca;
-                border-left: 3px solid #ef4444;
-            }}
-            
-            .visit-button {{
-                display: block;
-                background-color: #3b82f6;
-                color: #ffffff;
-                text-decoration: none;
-                padding: 12px 24px;
-                border-radius: 6px;
-                font-weight: 500;
-                text-align: center;
-                margin-bottom: 24px;
-            }}
-            
-            .footer {{
-                padding: 16px 24px;
-                background-color: #0f172a;
-                border-top: 1px solid #334155;
-                text-align: center;
-            }}
-            
-            .footer p {{
-                color: #64748b;
-                font-size: 12px;
-                margin-bottom: 4px;
-            }}
-            
-            .footer p:last-child {{
-                margin-bottom: 0;
-                color: #475569;
-            }}
-            
-            /* Mobile adjustments */
-            @media (max-width: 600px) {{
-                body {{
-                    padding: 8px;
-                }}
-                
-                .container {{
-                    border-radius: 6px;
-                }}
-                
-                .header {{
-                    padding: 20px;
-                }}
-                
-                .content {{
-                    padding: 20px;
-                }}
-                
-                .site-info {{
-                    padding: 14px;
-                }}
-                
-                .change-content {{
-                    padding: 14px;
-                    font-size: 13px;
-                }}
-                
-                .visit-button {{
-                    padding: 14px 20px;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>{site_name}</h1>
-                <p class="timestamp">{timestamp}</p>
-            </div>
-            
-            <div class="content">
-                <div class="site-info">
-                    <div class="site-name">{site_name}</div>
-                    <a href="{url}" class="site-url">{display_url}</a>
-                </div>
-                
-                <div class="changes">
-                    <div class="change-block">
-                        <div class="change-header new">+ Added</div>
-                        <div class="change-content new">{change_info['new']}</div>
-                    </div>
-                    
-                    <div class="change-block">
-                        <div class="change-header old">- Removed</div>
-                        <div class="change-content old">{change_info['old']}</div>
-                    </div>
-                </div>
-                
-                <a href="{url}" class="visit-button">Visit Website</a>
-            </div>
-            
-            <div class="footer">
-                <p>Website Monitor © {datetime.now().year}</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    text = f"""
-    WEBSITE CHANGE DETECTED
-    Time: {timestamp}
+        return None
     
-    A change has been detected on the website you're monitoring:
+    templates = dict(email_config.get("templates") or {})
+    templates.update(change_info.get("templates") or {})
     
-    Website: {site_name}
-    URL: {url}
-    
-    NEW CONTENT:
-    {change_info['new']}
-    
-    PREVIOUS CONTENT:
-    {change_info['old']}
-    
-    This is an automated notification from your Website Monitor.
-    """
+    if change_info.get("digest"):
+        subject, text, html = render_digest(change_info, templates)
+    else:
+        subject, text, html = render_change(change_info, templates)
     
     msg = MIMEMultipart('alternative')
     msg['Subject'] = subject
@@ -287,21 +77,116 @@ def send_email_notification(change_info, config):
     msg.attach(MIMEText(text, 'plain'))
     msg.attach(MIMEText(html, 'html'))
 
-    _send_email(msg, config)
-    logging.info(f"Email notification sent to {len(recipients)} recipient(s): {', '.join(recipients)}")
+    return msg, recipients
 
-def _send_email(msg, config):
-    email_config = config["email"]
+def render_change(change_info, templates=None):
+    now = datetime.now()
+    site_name = change_info["site_name"]
+    url = change_info["url"]
     
-    if email_config["use_ssl"]:
-        server = smtplib.SMTP_SSL(email_config["smtp_server"], email_config["smtp_port"])
-    else:
-        server = smtplib.SMTP(email_config["smtp_server"], email_config["smtp_port"])
-        if email_config["use_tls"]:
-            server.starttls()
+    display_url = url
+    if len(url) > 40:
+        display_url = url[:37] + "..."
     
-    if email_config["smtp_username"] and email_config["smtp_password"]:
-        server.login(email_config["smtp_username"], email_config["smtp_password"])
+    subject = f"🔔 Change Detected: {site_name}"
     
-    server.send_message(msg)
-    server.quit()
\ No newline at end of file
+    values = {
+        "site_name": site_name,
+        "url": url,
+        "display_url": display_url,
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "year": now.year,
+        "new": change_info["new"],
+        "old": change_info["old"]
+    }
+    values.update(diff_values(change_info))
+    
+    html = template_store.get_named("html", templates).render(values)
+    text = template_store.get_named("text", templates).render(values)
+    return subject, text, html
+
+def diff_values(change):
+    # Changes restored from an older spool may not carry a diff yet
+    diff = change.get("diff") or compute_diff(change["old"], change["new"])
+    return {
+        "diff": render_diff_text(diff),
+        "diff_html": render_diff_html(diff),
+        "diff_summary": diff["summary"]
+    }
+
+def render_digest(digest, templates=None):
+    now = datetime.now()
+    sites = digest["sites"]
+    change_count = digest["change_count"]
+    
+    subject = f"🔔 {change_count} Change{'s' if change_count > 1 else ''} Detected: {', '.join(site['site_name'] for site in sites)}"
+    if len(subject) > 120:
+        subject = f"🔔 {change_count} Changes Detected on {len(sites)} Sites"
+    
+    site_html = template_store.get_named("digest_site_html", templates)
+    site_text = template_store.get_named("digest_site_text", templates)
+    change_html = template_store.get_named("digest_change_html", templates)
+    change_text = template_store.get_named("digest_change_text", templates)
+    
+    site_blocks = []
+    text_blocks = []
+    for site in sites:
+        change_blocks = []
+        text_changes = []
+        for change in site["changes"]:
+            values = {
+                "changed_at": datetime.fromtimestamp(change["time"]).strftime("%H:%M:%S"),
+                "new": change["new"],
+                "old": change["old"]
+            }
+            values.update(diff_values(change))
+            change_blocks.append(change_html.render(values))
+            text_changes.append(change_text.render(values))
+        
+        values = {"site_name": site["site_name"], "url": site["url"]}
+        site_blocks.append(site_html.render(dict(values, changes_html="".join(change_blocks))))
+        text_blocks.append(site_text.render(dict(values, changes="".join(text_changes))))
+    
+    values = {
+        "title": f"{change_count} change{'s' if change_count > 1 else ''} on {len(sites)} site{'s' if len(sites) > 1 else ''}",
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "year": now.year,
+        "change_count": change_count,
+        "sites_html": "".join(site_blocks),
+        "sites": "".join(text_blocks)
+    }
+    
+    html = template_store.get_named("digest_html", templates).render(values)
+    text = template_store.get_named("digest_text", templates).render(values)
+    return subject, text, html
+
+def get_connection_manager(config):
+    email_config = config["email"]
+    key = (
+        email_config["smtp_server"],
+        email_config["smtp_port"],
+        email_config.get("smtp_username"),
+        email_config.get("use_ssl", False),
+        email_config.get("use_tls", False)
+    )
+    
+    manager = _connection_managers.get(key)
+    if manager is None:
+        manager = SMTPConnectionManager(
+            email_config,
+            keep_alive=email_config.get("keep_alive", True),
+            idle_timeout=email_config.get("idle_timeout_seconds", 60),
+            health_check_after=email_config.get("health_check_after_seconds", 5)
+        )
+        _connection_managers[key] = manager
+    else:
+        manager.email_config = email_config
+    return manager
+
+def close_idle_connections():
+    for manager in _connection_managers.values():
+        manager.close_if_idle()
+
+def close_connections():
+    for manager in _connection_managers.values():
+        manager.close()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import logging
+import os
+import signal
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Allocations made by tracemalloc itself would otherwise top every phase
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>")
+)
+
+
+class MemoryProfiler:
+    # Opt-in tracemalloc tracing; each check phase takes a snapshot before and after, and what grew is
+    # charged to that phase. Checks running in parallel share one heap, so attribution is approximate.
+    def __init__(self, output_dir, top=10, frames=1, name=None):
+        self.output_dir = output_dir
+        self.top = top
+        self.frames = frames
+        self.name = name
+        self.lock = threading.RLock()
+        self.phases = {}
+
+    @property
+    def active(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        with self.lock:
+            if self.active:
+                return
+            self.phases = {}
+            tracemalloc.start(self.frames)
+        logging.info(f"Memory tracing started ({self.frames} frame(s) per allocation)")
+
+    def stop(self):
+        with self.lock:
+            if self.active:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        if not self.active:
+            yield
+            return
+        before = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        try:
+            yield
+        finally:
+            if self.active:
+                after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+                self.record(name, after.compare_to(before, "traceback" if self.frames > 1 else "lineno"))
+
+    def record(self, name, differences):
+        with self.lock:
+            phase = self.phases.setdefault(name, {"runs": 0, "sites": {}})
+            phase["runs"] += 1
+            for stat in differences:
+                if stat.size_diff <= 0:
+                    continue
+                site = phase["sites"].setdefault(stat.traceback, [0, 0])
+                site[0] += stat.size_diff
+                site[1] += max(stat.count_diff, 0)
+
+    def format_report(self):
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024:.1f} KiB current, {peak / 1024:.1f} KiB peak"]
+        with self.lock:
+            phases = sorted(self.phases.items())
+            for name, phase in phases:
+                sites = sorted(phase["sites"].items(), key=lambda item: item[1][0], reverse=True)
+                total = sum(size for size, _ in phase["sites"].values())
+                lines.append("")
+                lines.append(f"Phase {name}: {phase['runs']} run(s), {total / 1024:.1f} KiB allocated and still held at phase end")
+                for traceback, (size, count) in sites[:self.top]:
+                    lines.append(f"  {size / 1024:10.1f} KiB  {count:8d} block(s)  {traceback[-1]}")
+                    for frame in list(traceback)[-2::-1]:
+                        lines.append(f"{'':34}{frame}")
+        if not phases:
+            lines.append("No check phase has run since tracing started")
+        return "\n".join(lines)
+
+    def report(self):
+        if not self.active:
+            logging.warning("Memory tracing is not running, no report written")
+            return None
+        report = self.format_report()
+        suffix = "" if self.name is None else f"_shard{self.name}"
+        path = os.path.join(self.output_dir, f"memory_profile{suffix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+        except OSError as e:
+            logging.error(f"Error writing memory profile {path}: {e}")
+            path = None
+        logging.info(f"Memory profile{f' written to {path}' if path else ''}:\n{report}")
+        return path
+
+    def toggle(self):
+        # The first signal starts tracing, every later one writes a report of what was traced so far
+        if self.active:
+            self.report()
+        else:
+            self.start()
+
+    def install_signal_handler(self):
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        # Snapshots and logging take locks the interrupted code may hold, so the work runs on its own thread
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=self.toggle, daemon=True).start())
+        return True
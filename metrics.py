@@ -0,0 +1,249 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            yield self.name, format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        # A callback is evaluated on every scrape and returns {label values: value}
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def samples(self):
+        with self.lock:
+            items = dict(self.values)
+        if self.callback is not None:
+            try:
+                items.update(self.callback())
+            except Exception as e:
+                logging.error(f"Failed to collect metric {self.name}: {e}")
+        for labels, value in items.items():
+            yield self.name, format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last one is +Inf), sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0]
+                self.values[labels] = series
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        with self.lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self.values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", format_labels(self.labelnames, labels, ("le", format_value(bound))), cumulative
+            yield f"{self.name}_sum", format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", format_labels(self.labelnames, labels), cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), callback=None):
+        return self.register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MonitorMetrics:
+    def __init__(self, registry=None, per_site=False):
+        self.registry = registry or MetricsRegistry()
+        self.per_site = per_site
+        # Set to a MemoryProfiler to attribute allocations to the stage that made them
+        self.profiler = None
+
+        self.stage_seconds = self.registry.histogram(
+            "website_monitor_stage_seconds", "Time spent in each stage of a check", ("stage",)
+        )
+        self.check_seconds = self.registry.histogram(
+            "website_monitor_check_seconds", "Wall time of a whole check, a shared fetch counts once"
+        )
+        self.checks = self.registry.counter(
+            "website_monitor_checks_total", "Checks by result", ("result",)
+        )
+        self.scheduler_lag = self.registry.histogram(
+            "website_monitor_scheduler_lag_seconds", "How late checks started compared to their scheduled time",
+            buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+        )
+        self.notifications = self.registry.counter(
+            "website_monitor_notifications_total", "Change notifications by delivery path", ("path",)
+        )
+        if per_site:
+            self.site_stage_seconds = self.registry.histogram(
+                "website_monitor_site_stage_seconds", "Time spent in each stage of a check per site", ("site", "stage")
+            )
+            self.site_checks = self.registry.counter(
+                "website_monitor_site_checks_total", "Checks by result per site", ("site", "result")
+            )
+
+    def observe_stage(self, stage, seconds, site_id=None):
+        # A shared fetch passes every site it served, the global histogram still sees it once
+        self.stage_seconds.observe(seconds, stage)
+        if self.per_site and site_id is not None:
+            for site in site_id if isinstance(site_id, (list, tuple)) else [site_id]:
+                self.site_stage_seconds.observe(seconds, site, stage)
+
+    @contextmanager
+    def stage(self, stage, site_id=None):
+        if self.profiler is not None and self.profiler.active:
+            with self.profiler.phase(stage), self.timed_stage(stage, site_id):
+                yield
+            return
+        with self.timed_stage(stage, site_id):
+            yield
+
+    @contextmanager
+    def timed_stage(self, stage, site_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start, site_id)
+
+    def count_check(self, result, site_id=None):
+        self.checks.inc(result)
+        if self.per_site and site_id is not None:
+            self.site_checks.inc(site_id, result)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    def __init__(self, registry, host="127.0.0.1", port=9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self.registry
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        logging.info(f"Serving metrics on http://{self.host}:{self.server.server_address[1]}/metrics")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
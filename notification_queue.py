@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from mail_notification import send_email_notifications
+
+
+class NotificationQueue:
+    def __init__(self, config, spool_dir, max_size=1000, workers=1, max_attempts=5,
+                 retry_base_delay=5, retry_max_delay=300, batch_size=20,
+                 sender=send_email_notifications):
+        self.config = config
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.max_size = max_size
+        self.worker_count = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.batch_size = batch_size
+        self.sender = sender
+
+        self.queue = queue.Queue(maxsize=max_size)
+        self.retries = []
+        self.retry_counter = itertools.count()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.workers = []
+
+        self.latencies = deque(maxlen=1000)
+        self.metrics = {
+            "enqueued": 0,
+            "delivered": 0,
+            "failed": 0,
+            "retried": 0,
+            "overflowed": 0
+        }
+
+        os.makedirs(self.failed_dir, exist_ok=True)
+
+    def start(self):
+        self.load_spool()
+        for index in range(self.worker_count):
+            worker = threading.Thread(target=self._worker, name=f"notification-worker-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self, timeout=10):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout)
+        pending = self.depth()
+        if pending:
+            logging.info(f"Notification queue stopped with {pending} notification(s) left in the spool")
+
+    def enqueue(self, change_info):
+        item = {
+            "id": uuid.uuid4().hex,
+            "change_info": change_info,
+            "enqueued_at": time.time(),
+            "attempts": 0
+        }
+        self._spool(item)
+
+        with self.lock:
+            self.metrics["enqueued"] += 1
+
+        # Enqueueing runs on the check path, a full queue must not hold up the monitor loop
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self.lock:
+                self.metrics["overflowed"] += 1
+            logging.warning(f"Notification queue is full, notification for {change_info['site_name']} stays in the spool until restart")
+            return
+
+        if self.queue.qsize() >= self.max_size * 0.8:
+            logging.warning(f"Notification queue is falling behind: {self.queue.qsize()}/{self.max_size} pending")
+
+    def depth(self):
+        with self.lock:
+            return self.queue.qsize() + len(self.retries)
+
+    def get_metrics(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+            latencies = sorted(self.latencies)
+            retry_depth = len(self.retries)
+
+        metrics["depth"] = self.queue.qsize() + retry_depth
+        metrics["retry_depth"] = retry_depth
+        if latencies:
+            metrics["latency_avg_seconds"] = sum(latencies) / len(latencies)
+            metrics["latency_p95_seconds"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            metrics["latency_max_seconds"] = latencies[-1]
+        return metrics
+
+    def load_spool(self):
+        items = []
+        for filename in os.listdir(self.spool_dir):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, filename)
+            try:
+                with open(path, 'r') as f:
+                    items.append(json.load(f))
+            except Exception as e:
+                logging.error(f"Failed to load spooled notification {filename}: {e}")
+
+        items.sort(key=lambda item: item["enqueued_at"])
+        for item in items:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                logging.warning(f"Notification queue is full, {len(items)} spooled notification(s) not all restored")
+                break
+
+        if items:
+            logging.info(f"Restored {min(len(items), self.max_size)} spooled notification(s)")
+
+    def _spool_path(self, item):
+        return os.path.join(self.spool_dir, f"{item['id']}.json")
+
+    def _spool(self, item):
+        path = self._spool_path(item)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(item, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logging.error(f"Failed to spool notification {item['id']}: {e}")
+
+    def _unspool(self, item, failed=False):
+        path = self._spool_path(item)
+        try:
+            if failed:
+                os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Failed to remove spooled notification {item['id']}: {e}")
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+
+    def _next_batch(self):
+        now = time.time()
+        batch = []
+        wait_time = 1
+
+        with self.lock:
+            while self.retries and self.retries[0][0] <= now and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(self.retries)[2])
+            if self.retries:
+                wait_time = max(0.05, min(wait_time, self.retries[0][0] - now))
+
+        if not batch:
+            try:
+                batch.append(self.queue.get(timeout=wait_time))
+            except queue.Empty:
+                return batch
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch):
+        change_infos = [item["change_info"] for item in batch]
+        try:
+            failures = self.sender(change_infos, self.config)
+        except Exception as e:
+            failures = [(change_info, e) for change_info in change_infos]
+        errors = dict((id(change_info), e) for change_info, e in failures)
+
+        now = time.time()
+        for item in batch:
+            error = errors.get(id(item["change_info"]))
+            site_name = item["change_info"]["site_name"]
+
+            if error is None:
+                self._unspool(item)
+                with self.lock:
+                    self.metrics["delivered"] += 1
+                    self.latencies.append(now - item["enqueued_at"])
+                continue
+
+            item["attempts"] += 1
+            if item["attempts"] >= self.max_attempts:
+                logging.error(f"Giving up on notification for {site_name} after {item['attempts']} attempts: {error}")
+                self._unspool(item, failed=True)
+                with self.lock:
+                    self.metrics["failed"] += 1
+                continue
+
+            delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (item["attempts"] - 1))
+            logging.warning(f"Failed to send notification for {site_name} (attempt {item['attempts']}), retrying in {delay:.1f}s: {error}")
+            self._spool(item)
+            with self.lock:
+                self.metrics["retried"] += 1
+                heapq.heappush(self.retries, (now + delay, next(self.retry_counter), item))
+
+        logging.debug(f"Notification queue metrics: {self.get_metrics()}")
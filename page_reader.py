@@ -0,0 +1,50 @@
+from bs4 import UnicodeDammit
+
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class PageBody:
+    def __init__(self, response, content=b"", truncated=False, stopped_early=False):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.encoding = response.encoding
+        self.content = content
+        # truncated: cut off at max_body_bytes, stopped_early: every watched element had already closed
+        self.truncated = truncated
+        self.stopped_early = stopped_early
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            if self.encoding is not None:
+                try:
+                    self._text = str(self.content, self.encoding, errors="replace")
+                except LookupError:
+                    self._text = None
+            if self._text is None:
+                self._text = UnicodeDammit(self.content, is_html=True).unicode_markup or ""
+        return self._text
+
+
+def read_body(response, max_bytes=DEFAULT_MAX_BODY_BYTES, watcher=None, chunk_size=CHUNK_SIZE):
+    body = bytearray()
+    truncated = False
+    stopped_early = False
+
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if len(body) + len(chunk) > max_bytes:
+                body.extend(chunk[:max_bytes - len(body)])
+                truncated = True
+                break
+            body.extend(chunk)
+            if watcher is not None and watcher.feed(body):
+                stopped_early = True
+                break
+    finally:
+        # Closing a partly read response drops the connection instead of draining the rest of the body
+        response.close()
+
+    return PageBody(response, bytes(body), truncated, stopped_early)
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import random
+import time
+
+
+class CheckScheduler:
+    def __init__(self, max_checks_per_second=None):
+        self.max_checks_per_second = max_checks_per_second
+        self.sites = {}
+        self.entries = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.current_second = None
+        self.started_this_second = 0
+
+    def __len__(self):
+        return len(self.sites)
+
+    def __contains__(self, site_id):
+        return site_id in self.sites
+
+    def add_site(self, site_config, due=None):
+        site_id = site_config["id"]
+        self.sites[site_id] = site_config
+        self.schedule(site_id, time.time() if due is None else due)
+
+    def update_site(self, site_config):
+        self.sites[site_config["id"]] = site_config
+
+    def remove_site(self, site_id):
+        self.sites.pop(site_id, None)
+        self._invalidate(site_id)
+
+    def schedule(self, site_id, due):
+        if site_id not in self.sites:
+            return
+        self._invalidate(site_id)
+        # Entries are [due, sequence, site_id, active]; removed entries are skipped lazily
+        entry = [due, next(self.counter), site_id, True]
+        self.entries[site_id] = entry
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self._compact()
+
+    def reschedule(self, site_id, now=None):
+        site_config = self.sites.get(site_id)
+        if site_config is None:
+            return None
+
+        interval_minutes = self.pick_interval(site_config)
+        self.schedule(site_id, (time.time() if now is None else now) + interval_minutes * 60)
+        return interval_minutes
+
+    @staticmethod
+    def pick_interval(site_config):
+        min_interval = site_config.get("min_check_interval_minutes", 5)
+        max_interval = site_config.get("max_check_interval_minutes", min_interval * 2)
+
+        if max_interval < min_interval:
+            max_interval = min_interval
+
+        return random.uniform(min_interval, max_interval)
+
+    def plan_startup(self, site_configs, last_checks, now=None, warmup_seconds=0):
+        now = time.time() if now is None else now
+        overdue = []
+        resumed = 0
+
+        for site_config in site_configs:
+            site_id = site_config["id"]
+            self.sites[site_id] = site_config
+            last_check = last_checks.get(site_id)
+            due = None if last_check is None else last_check + self.pick_interval(site_config) * 60
+            if due is not None and due > now:
+                self.schedule(site_id, due)
+                resumed += 1
+            else:
+                overdue.append((due if due is not None else float("-inf"), site_id))
+
+        # Most overdue (and never checked) sites go first, the rest are spread evenly over the warm-up window
+        overdue.sort()
+        spacing = warmup_seconds / len(overdue) if overdue else 0
+        for index, (_, site_id) in enumerate(overdue):
+            self.schedule(site_id, now + index * spacing)
+
+        return resumed, len(overdue)
+
+    def next_due(self):
+        self._prune()
+        return self.heap[0][0] if self.heap else None
+
+    def peek(self):
+        self._prune()
+        return self.sites[self.heap[0][2]] if self.heap else None
+
+    def due_time(self, site_id):
+        entry = self.entries.get(site_id)
+        return entry[0] if entry is not None else None
+
+    def pop_due(self, now=None):
+        return [site_config for site_config, _ in self.pop_due_entries(now)]
+
+    def pop_due_entries(self, now=None):
+        now = time.time() if now is None else now
+
+        second = int(now)
+        if second != self.current_second:
+            self.current_second = second
+            self.started_this_second = 0
+
+        due_sites = []
+        while True:
+            self._prune()
+            if not self.heap or self.heap[0][0] > now:
+                break
+            if self.max_checks_per_second and self.started_this_second >= self.max_checks_per_second:
+                break
+
+            entry = heapq.heappop(self.heap)
+            entry[3] = False
+            del self.entries[entry[2]]
+            due_sites.append((self.sites[entry[2]], entry[0]))
+            self.started_this_second += 1
+
+        return due_sites
+
+    def take(self, site_id):
+        # Removes a pending entry so its check can run early, returns (site_config, due) or None
+        entry = self.entries.get(site_id)
+        if entry is None:
+            return None
+        self._invalidate(site_id)
+        return self.sites[site_id], entry[0]
+
+    def _invalidate(self, site_id):
+        entry = self.entries.pop(site_id, None)
+        if entry is not None:
+            entry[3] = False
+
+    def _prune(self):
+        while self.heap and not self.heap[0][3]:
+            heapq.heappop(self.heap)
+
+    def _compact(self):
+        self.heap = [entry for entry in self.heap if entry[3]]
+        heapq.heapify(self.heap)
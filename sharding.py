@@ -0,0 +1,142 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, shard_count, virtual_nodes=100, salt=""):
+        self.shard_count = shard_count
+        # Virtual nodes smooth the distribution and keep most sites in place when the shard count changes
+        points = sorted(
+            (ring_hash(f"{salt}:{shard}:{replica}"), shard)
+            for shard in range(shard_count)
+            for replica in range(virtual_nodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+        self.salt = salt
+
+    def shard_for(self, key):
+        index = bisect.bisect(self.hashes, ring_hash(f"{self.salt}:{key}"))
+        return self.shards[index % len(self.shards)]
+
+
+def select_sites(sites, shards, virtual_nodes=100):
+    # Each level splits the previous one, e.g. a host's slice split again across its worker processes
+    for level, (shard_index, shard_count) in enumerate(shards):
+        if shard_count <= 1:
+            continue
+        ring = HashRing(shard_count, virtual_nodes, salt=f"level{level}")
+        sites = [site for site in sites if ring.shard_for(site["id"]) == shard_index]
+    return sites
+
+
+def stop_worker(signum, frame):
+    # Ignore repeated signals so the shutdown in run() isn't interrupted halfway
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def run_worker(config_path, shards, notification_sink, trace_memory=False):
+    from website_listener import WebsiteMonitor
+
+    signal.signal(signal.SIGINT, stop_worker)
+    signal.signal(signal.SIGTERM, stop_worker)
+    monitor = WebsiteMonitor(config_path, shards=shards, notification_sink=notification_sink, trace_memory=trace_memory)
+    monitor.run()
+
+
+class ShardCoordinator:
+    def __init__(self, config_path, workers, shard_index=0, shard_count=1, trace_memory=False):
+        self.config_path = config_path
+        self.trace_memory = trace_memory
+        self.workers = workers
+        self.host_shard = (shard_index, shard_count)
+        self.context = multiprocessing.get_context("spawn")
+        self.notifications = self.context.Queue()
+        self.processes = {}
+        self.monitor = None
+
+    def start_worker(self, worker_index):
+        shards = [self.host_shard, (worker_index, self.workers)]
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.config_path, shards, self.notifications, self.trace_memory),
+            name=f"monitor-shard-{worker_index}"
+        )
+        process.start()
+        self.processes[worker_index] = process
+        return process
+
+    def check_workers(self):
+        for worker_index, process in list(self.processes.items()):
+            if not process.is_alive():
+                logging.error(f"Worker {worker_index} exited with code {process.exitcode}, restarting it")
+                self.start_worker(worker_index)
+
+    def run(self):
+        from website_listener import WebsiteMonitor
+
+        # Workers are started first so they are spawned before this process opens connections or threads
+        for worker_index in range(self.workers):
+            self.start_worker(worker_index)
+
+        try:
+            # The coordinator's monitor never checks sites, it only delivers what the workers report
+            self.monitor = WebsiteMonitor(self.config_path, shards=[self.host_shard], notifications_only=True)
+            logging.info(f"Started {self.workers} worker process(es) for {len(self.monitor.config['sites'])} site(s)")
+
+            if self.monitor.notification_queue is not None:
+                self.monitor.notification_queue.start()
+
+            while True:
+                self.deliver(timeout=1)
+                self.monitor.flush_digests()
+                self.monitor.reload_config()
+                self.check_workers()
+        except KeyboardInterrupt:
+            logging.info("Monitoring stopped by user")
+        finally:
+            self.stop()
+
+    def deliver(self, timeout=0):
+        changes = []
+        try:
+            changes.extend(self.notifications.get(timeout=timeout))
+            while True:
+                changes.extend(self.notifications.get_nowait())
+        except queue.Empty:
+            pass
+
+        if changes and self.monitor is not None:
+            self.monitor.send_notifications(changes)
+        return len(changes)
+
+    def stop(self, timeout=30):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        # Keep draining while waiting, a worker can't exit until its queued notifications are read
+        deadline = time.time() + timeout
+        while any(process.is_alive() for process in self.processes.values()) and time.time() < deadline:
+            self.deliver(timeout=0.5)
+
+        for process in self.processes.values():
+            if process.is_alive():
+                logging.warning(f"Worker {process.name} did not stop in time, killing it")
+                process.kill()
+            process.join()
+
+        self.deliver()
+        if self.monitor is not None:
+            self.monitor.shutdown()
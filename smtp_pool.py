@@ -0,0 +1,119 @@
+import logging
+import smtplib
+import threading
+import time
+
+
+def _is_connection_error(error):
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # Every SMTPException is an OSError, only plain socket errors mean the connection is gone
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionManager:
+    def __init__(self, email_config, keep_alive=True, idle_timeout=60, health_check_after=5):
+        self.email_config = email_config
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.server = None
+        self.last_used = 0
+        self.lock = threading.RLock()
+
+    def connect(self):
+        email_config = self.email_config
+        host = email_config["smtp_server"]
+        port = email_config["smtp_port"]
+        timeout = email_config.get("timeout_seconds", 30)
+
+        if email_config.get("use_ssl", False):
+            server = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+            if email_config.get("use_tls", False):
+                server.starttls()
+
+        if email_config.get("smtp_username") and email_config.get("smtp_password"):
+            server.login(email_config["smtp_username"], email_config["smtp_password"])
+
+        logging.debug(f"Opened SMTP connection to {host}:{port}")
+        return server
+
+    def is_alive(self):
+        try:
+            return self.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def get_connection(self):
+        with self.lock:
+            if self.server is not None:
+                idle = time.monotonic() - self.last_used
+                if idle > self.idle_timeout:
+                    logging.debug("SMTP connection idle for too long, reconnecting")
+                    self.close()
+                # A connection used moments ago is trusted, a drop mid-burst is caught by the retry in send_message
+                elif idle > self.health_check_after and not self.is_alive():
+                    logging.info("SMTP connection failed health check, reconnecting")
+                    self.discard()
+
+            if self.server is None:
+                self.server = self.connect()
+                self.last_used = time.monotonic()
+            return self.server
+
+    def send_message(self, msg):
+        with self.lock:
+            for attempt in range(2):
+                server = self.get_connection()
+                try:
+                    server.send_message(msg)
+                    self.last_used = time.monotonic()
+                    return
+                except Exception as e:
+                    if not _is_connection_error(e) or attempt:
+                        raise
+                    logging.info(f"SMTP connection lost while sending ({e}), reconnecting")
+                    self.discard()
+
+    def send_messages(self, messages):
+        errors = []
+        with self.lock:
+            try:
+                for msg in messages:
+                    try:
+                        self.send_message(msg)
+                        errors.append(None)
+                    except Exception as e:
+                        errors.append(e)
+            finally:
+                if not self.keep_alive:
+                    self.close()
+        return errors
+
+    def close_if_idle(self):
+        with self.lock:
+            if self.server is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                logging.debug("Closing idle SMTP connection")
+                self.close()
+
+    def close(self):
+        with self.lock:
+            if self.server is None:
+                return
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+    def discard(self):
+        with self.lock:
+            if self.server is None:
+                return
+            try:
+                self.server.close()
+            except OSError:
+                pass
+            self.server = None
@@ -0,0 +1,247 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class StateStore:
+    def load_all(self, site_ids):
+        raise NotImplementedError
+
+    def load(self, site_id):
+        raise NotImplementedError
+
+    def save(self, site_id, state):
+        raise NotImplementedError
+
+    # Check records hold the last check time and stats, written after every check; states only change with content
+    def load_checks(self, site_ids):
+        raise NotImplementedError
+
+    def save_check(self, site_id, record):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JsonStateStore(StateStore):
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def get_site_state_path(self, site_id):
+        return os.path.join(self.data_dir, f"{site_id}.json")
+
+    def get_check_path(self, site_id):
+        return os.path.join(self.data_dir, f"{site_id}.check")
+
+    def load(self, site_id):
+        state_path = self.get_site_state_path(site_id)
+        if not os.path.exists(state_path):
+            return None
+        with open(state_path, 'r') as f:
+            return json.load(f)
+
+    def load_all(self, site_ids):
+        states = {}
+        for site_id in site_ids:
+            try:
+                state = self.load(site_id)
+            except Exception as e:
+                logging.error(f"Failed to load previous state for site {site_id}: {e}")
+                continue
+            if state is not None:
+                states[site_id] = state
+        return states
+
+    def save(self, site_id, state):
+        self.write_atomic(self.get_site_state_path(site_id), state, indent=4)
+
+    def load_checks(self, site_ids):
+        records = {}
+        for site_id in site_ids:
+            check_path = self.get_check_path(site_id)
+            if not os.path.exists(check_path):
+                continue
+            try:
+                with open(check_path, 'r') as f:
+                    records[site_id] = json.load(f)
+            except Exception as e:
+                logging.error(f"Failed to load last check for site {site_id}: {e}")
+        return records
+
+    def save_check(self, site_id, record):
+        self.write_atomic(self.get_check_path(site_id), record)
+
+    @staticmethod
+    def write_atomic(path, value, indent=None):
+        temp_path = path + ".tmp"
+        # Write to a temporary file first so a crash never leaves a half-written state
+        with open(temp_path, 'w') as f:
+            json.dump(value, f, indent=indent)
+        os.replace(temp_path, path)
+
+
+class SQLiteStateStore(StateStore):
+    def __init__(self, path, data_dir=None, batch_size=100, flush_interval=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.pending_checks = {}
+        self.last_flush = time.monotonic()
+        self.lock = threading.RLock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS site_state ("
+                "site_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS site_check (site_id TEXT PRIMARY KEY, record TEXT NOT NULL)"
+            )
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        if data_dir is not None:
+            self.migrate_json_states(data_dir)
+
+    def migrate_json_states(self, data_dir):
+        with self.lock:
+            migrated = self.connection.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if migrated:
+                return
+
+            rows = []
+            for state_path in glob.glob(os.path.join(data_dir, "*.json")):
+                site_id = os.path.basename(state_path)[:-len(".json")]
+                try:
+                    with open(state_path, 'r') as f:
+                        state = json.load(f)
+                    rows.append((site_id, json.dumps(state), os.path.getmtime(state_path)))
+                except Exception as e:
+                    logging.error(f"Failed to migrate state file {state_path}: {e}")
+
+            check_rows = []
+            for check_path in glob.glob(os.path.join(data_dir, "*.check")):
+                site_id = os.path.basename(check_path)[:-len(".check")]
+                try:
+                    with open(check_path, 'r') as f:
+                        check_rows.append((site_id, json.dumps(json.load(f))))
+                except Exception as e:
+                    logging.error(f"Failed to migrate check file {check_path}: {e}")
+
+            with self.connection:
+                # Existing rows win, they are newer than any leftover JSON file
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO site_state (site_id, state, updated_at) VALUES (?, ?, ?)", rows
+                )
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO site_check (site_id, record) VALUES (?, ?)", check_rows
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (str(time.time()),)
+                )
+
+        if rows or check_rows:
+            logging.info(f"Migrated {len(rows)} JSON state file(s) and {len(check_rows)} check file(s) into {self.path}")
+
+    def load(self, site_id):
+        with self.lock:
+            if site_id in self.pending:
+                return json.loads(self.pending[site_id][0])
+            row = self.connection.execute("SELECT state FROM site_state WHERE site_id = ?", (site_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_all(self, site_ids):
+        wanted = set(site_ids)
+        states = {}
+        with self.lock:
+            for site_id, state in self.connection.execute("SELECT site_id, state FROM site_state"):
+                if site_id in wanted:
+                    try:
+                        states[site_id] = json.loads(state)
+                    except ValueError as e:
+                        logging.error(f"Failed to load previous state for site {site_id}: {e}")
+            for site_id, (state, _) in self.pending.items():
+                if site_id in wanted:
+                    states[site_id] = json.loads(state)
+        return states
+
+    def save(self, site_id, state):
+        with self.lock:
+            self.pending[site_id] = (json.dumps(state), time.time())
+            self.flush_if_due()
+
+    def load_checks(self, site_ids):
+        wanted = set(site_ids)
+        records = {}
+        with self.lock:
+            for site_id, record in self.connection.execute("SELECT site_id, record FROM site_check"):
+                if site_id in wanted:
+                    try:
+                        records[site_id] = json.loads(record)
+                    except ValueError as e:
+                        logging.error(f"Failed to load last check for site {site_id}: {e}")
+            for site_id, record in self.pending_checks.items():
+                if site_id in wanted:
+                    records[site_id] = json.loads(record)
+        return records
+
+    def save_check(self, site_id, record):
+        with self.lock:
+            self.pending_checks[site_id] = json.dumps(record)
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        pending = len(self.pending) + len(self.pending_checks)
+        if pending >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.pending and not self.pending_checks:
+                return
+            rows = [(site_id, state, updated_at) for site_id, (state, updated_at) in self.pending.items()]
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO site_state (site_id, state, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(site_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                    rows
+                )
+                self.connection.executemany(
+                    "INSERT INTO site_check (site_id, record) VALUES (?, ?) "
+                    "ON CONFLICT(site_id) DO UPDATE SET record = excluded.record",
+                    list(self.pending_checks.items())
+                )
+            self.pending.clear()
+            self.pending_checks.clear()
+            logging.debug(f"Flushed {len(rows)} site state(s) to {self.path}")
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+
+def create_state_store(state_config, data_dir):
+    backend = state_config.get("backend", "json")
+    if backend == "sqlite":
+        return SQLiteStateStore(
+            state_config.get("path", os.path.join(data_dir, "state.db")),
+            data_dir=data_dir,
+            batch_size=state_config.get("batch_size", 100),
+            flush_interval=state_config.get("flush_interval_seconds", 5)
+        )
+    if backend != "json":
+        logging.warning(f"Unknown state backend '{backend}', falling back to json")
+    return JsonStateStore(data_dir)
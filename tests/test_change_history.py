@@ -0,0 +1,70 @@
+import pytest
+
+from change_history import ChangeHistory
+
+
+@pytest.fixture(params=[True, False], ids=["cached", "uncached"])
+def history(request, tmp_path):
+    history = ChangeHistory(str(tmp_path / "history.db"), snapshot_interval=4, cache_content=request.param)
+    yield history
+    history.close()
+
+
+def versions_of(base, count):
+    return [f"{base} price {index} EUR, available from Monday\nsecond line stays the same" for index in range(count)]
+
+
+def test_every_version_can_be_rebuilt(history):
+    contents = versions_of("Concert", 10)
+    for content in contents:
+        history.record("a", content)
+
+    for version, content in enumerate(contents, start=1):
+        assert history.rebuild("a", version) == content
+    kinds = [change["kind"] for change in history.list_changes("a")]
+    assert "delta" in kinds
+    # A full snapshot at least every snapshot_interval versions
+    assert kinds[0] == "snapshot" and kinds[4] == "snapshot"
+
+
+def test_unchanged_content_does_not_add_a_version(history):
+    assert history.record("a", "same") == 1
+    assert history.record("a", "same") == 1
+    assert history.record("a", "other") == 2
+
+
+def test_head_is_restored_after_reopening(tmp_path):
+    path = str(tmp_path / "history.db")
+    history = ChangeHistory(path)
+    for content in versions_of("Show", 3):
+        history.record("a", content)
+    history.close()
+
+    reopened = ChangeHistory(path, cache_content=False)
+    assert reopened.record("a", versions_of("Show", 3)[-1]) == 3
+    assert reopened.record("a", "new content") == 4
+    assert reopened.rebuild("a", 4) == "new content"
+    reopened.close()
+
+
+def test_get_version_at(history):
+    history.record("a", "first", recorded_at=100)
+    history.record("a", "second", recorded_at=200)
+
+    assert history.get_version_at("a", 150)["content"] == "first"
+    assert history.get_version_at("a", 250)["content"] == "second"
+    assert history.get_version_at("a", 50) is None
+
+
+def test_compact_keeps_the_newest_versions_rebuildable(tmp_path):
+    history = ChangeHistory(str(tmp_path / "history.db"), snapshot_interval=4)
+    contents = versions_of("Match", 10)
+    for content in contents:
+        history.record("a", content)
+
+    history.max_versions = 3
+    assert history.compact("a") == 7
+    assert [change["version"] for change in history.list_changes("a")] == [8, 9, 10]
+    assert history.rebuild("a", 8) == contents[7]
+    assert history.rebuild("a", 10) == contents[9]
+    history.close()
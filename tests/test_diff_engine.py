@@ -0,0 +1,54 @@
+from diff_engine import compute_diff, render_diff_html, render_diff_text
+
+
+def test_word_diff_shows_only_the_changed_words():
+    diff = compute_diff("Tickets from 40 EUR, on sale now", "Tickets from 45 EUR, on sale now")
+
+    assert diff["mode"] == "word"
+    assert len(diff["hunks"]) == 1
+    hunk = diff["hunks"][0]
+    assert hunk["removed"].strip() == "40"
+    assert hunk["added"].strip() == "45"
+    assert hunk["before"] == "Tickets from "
+
+
+def test_line_mode_keeps_whole_lines():
+    diff = compute_diff("a\nb\nc\n", "a\nx\nc\n", {"mode": "line"})
+
+    assert diff["mode"] == "line"
+    assert diff["hunks"][0]["removed"] == "b\n"
+    assert diff["hunks"][0]["added"] == "x\n"
+
+
+def test_identical_content_has_no_hunks():
+    diff = compute_diff("same", "same")
+    assert diff["hunks"] == []
+    assert diff["added"] == diff["removed"] == 0
+
+
+def test_too_large_input_is_summarized():
+    diff = compute_diff("a" * 100, "b" * 120, {"max_input_chars": 50})
+
+    assert diff["mode"] == "summary"
+    assert diff["truncated"]
+    assert "100 to 120 characters" in diff["summary"]
+
+
+def test_output_is_capped():
+    old = "\n".join(f"line {index} old" for index in range(100))
+    new = "\n".join(f"line {index} new" for index in range(100))
+    diff = compute_diff(old, new, {"max_output_chars": 200, "context_words": 0})
+
+    assert diff["truncated"]
+    assert len(diff["hunks"]) < 100
+    assert "showing the first" in diff["summary"]
+
+
+def test_renderers_escape_and_mark_changes():
+    diff = compute_diff("price <b>10</b>", "price <b>12</b>")
+
+    text = render_diff_text(diff)
+    assert "- <b>10</b>" in text and "+ <b>12</b>" in text
+    html = render_diff_html(diff)
+    assert '<del class="diff-removed">&lt;b&gt;10&lt;/b&gt;</del>' in html
+    assert "<ins" in html
@@ -0,0 +1,57 @@
+from digest import DigestBuffer
+
+
+def change(site_id, old, new):
+    return {"site_id": site_id, "site_name": site_id.title(), "url": f"https://example.com/{site_id}", "old": old, "new": new}
+
+
+def test_changes_are_grouped_per_recipients_until_the_window_ends():
+    buffer = DigestBuffer()
+    buffer.add(change("a", "1", "2"), ["x@example.com"], 60, now=0)
+    buffer.add(change("b", "1", "2"), ["x@example.com"], 60, now=10)
+    buffer.add(change("c", "1", "2"), ["y@example.com"], 60, now=10)
+
+    assert buffer.next_flush() == 60
+    assert buffer.pop_due(now=30) == []
+
+    digests = buffer.pop_due(now=60)
+    assert len(digests) == 1
+    assert digests[0]["site_id"] == "a,b"
+    assert digests[0]["change_count"] == 2
+    assert [d["site_id"] for d in buffer.pop_due(now=70)] == ["c"]
+
+
+def test_shorter_window_pulls_the_group_forward():
+    buffer = DigestBuffer()
+    buffer.add(change("a", "1", "2"), ["x@example.com"], 600, now=0)
+    buffer.add(change("b", "1", "2"), ["x@example.com"], 60, now=10)
+
+    assert buffer.next_flush() == 70
+
+
+def test_flap_back_to_the_original_value_is_dropped():
+    buffer = DigestBuffer()
+    buffer.add(change("a", "in stock", "sold out"), ["x@example.com"], 60, now=0)
+    buffer.add(change("a", "sold out", "in stock"), ["x@example.com"], 60, now=10)
+
+    assert buffer.pop_due(now=60) == []
+
+
+def test_detour_to_a_reported_value_is_removed():
+    buffer = DigestBuffer()
+    buffer.add(change("a", "1", "2"), ["x@example.com"], 60, now=0)
+    buffer.add(change("a", "2", "3"), ["x@example.com"], 60, now=10)
+    buffer.add(change("a", "3", "2"), ["x@example.com"], 60, now=20)
+
+    digest = buffer.pop_due(now=60)[0]
+    assert digest["change_count"] == 1
+    assert (digest["old"], digest["new"]) == ("1", "2")
+    assert digest["sites"][0]["flaps"] == 1
+
+
+def test_flush_all_ignores_the_window():
+    buffer = DigestBuffer()
+    buffer.add(change("a", "1", "2"), ["x@example.com"], 600, now=0)
+
+    assert len(buffer.pop_due(now=1, flush_all=True)) == 1
+    assert buffer.next_flush() is None
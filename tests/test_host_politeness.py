@@ -0,0 +1,115 @@
+from email.utils import formatdate
+
+from host_politeness import CLOSED, HALF_OPEN, OPEN, HostPoliteness, parse_retry_after
+
+URL = "https://example.com/tickets"
+OTHER_URL = "https://other.example.com/"
+
+
+def make_politeness(**options):
+    settings = dict(backoff_base=60, backoff_max=600, failure_threshold=3, open_seconds=300, probe_timeout=120)
+    settings.update(options)
+    return HostPoliteness(**settings)
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    now = 1_700_000_000
+    assert parse_retry_after("120", now) == 120
+    assert parse_retry_after(formatdate(now + 90, usegmt=True), now) == 90
+    assert parse_retry_after(formatdate(now - 90, usegmt=True), now) == 0
+    assert parse_retry_after("soon", now) is None
+    assert parse_retry_after(None, now) is None
+
+
+def test_throttle_backoff_doubles_up_to_the_cap():
+    politeness = make_politeness()
+    delays = [politeness.record_throttle(URL, 429, now=1000) for _ in range(6)]
+
+    assert delays == [60, 120, 240, 480, 600, 600]
+    assert politeness.retry_time(URL, now=1000) == 1600
+
+
+def test_retry_after_takes_precedence_over_the_backoff():
+    politeness = make_politeness()
+    politeness.record_throttle(URL, 429, now=1000)
+
+    assert politeness.record_throttle(URL, 503, retry_after="30", now=1000) == 30
+    # The longer backoff already in place is kept
+    assert politeness.retry_time(URL, now=1000) == 1060
+    assert politeness.record_throttle(URL, 429, retry_after="7200", now=1000) == 600
+
+
+def test_backoff_defers_requests_for_that_host_only():
+    politeness = make_politeness()
+    politeness.record_throttle(URL, 429, now=1000)
+
+    assert politeness.before_request(URL, now=1030) == (False, 1060)
+    assert politeness.before_request(OTHER_URL, now=1030) == (True, None)
+    assert politeness.before_request(URL, now=1060) == (True, None)
+
+
+def test_circuit_opens_after_failure_threshold():
+    politeness = make_politeness()
+    assert politeness.record_failure(URL, "timeout", now=1000) == 60
+    assert politeness.record_failure(URL, "timeout", now=1000) == 120
+    assert politeness.hosts["example.com"].circuit == CLOSED
+
+    assert politeness.record_failure(URL, "timeout", now=1000) == 300
+    state = politeness.hosts["example.com"]
+    assert state.circuit == OPEN
+    assert politeness.before_request(URL, now=1200) == (False, 1300)
+
+
+def test_half_open_lets_one_probe_through_until_it_times_out():
+    politeness = make_politeness(failure_threshold=1)
+    politeness.record_failure(URL, "timeout", now=1000)
+
+    assert politeness.before_request(URL, now=1300) == (True, None)
+    assert politeness.hosts["example.com"].circuit == HALF_OPEN
+    assert politeness.before_request(URL, now=1310) == (False, 1420)
+    # A probe that never reported back is given up on after probe_timeout
+    assert politeness.before_request(URL, now=1420) == (True, None)
+
+
+def test_failed_probe_doubles_the_open_period():
+    politeness = make_politeness(failure_threshold=1, backoff_max=3600)
+    assert politeness.record_failure(URL, "timeout", now=1000) == 300
+
+    politeness.before_request(URL, now=1300)
+    assert politeness.record_failure(URL, "timeout", now=1300) == 600
+    assert politeness.hosts["example.com"].circuit == OPEN
+
+    politeness.before_request(URL, now=1900)
+    assert politeness.record_failure(URL, "timeout", now=1900) == 1200
+
+
+def test_successful_probe_closes_the_circuit():
+    politeness = make_politeness(failure_threshold=1)
+    politeness.record_failure(URL, "timeout", now=1000)
+    politeness.before_request(URL, now=1300)
+    politeness.record_success(URL)
+
+    state = politeness.hosts["example.com"]
+    assert (state.circuit, state.failures, state.opens) == (CLOSED, 0, 0)
+    assert politeness.before_request(URL, now=1301) == (True, None)
+    assert politeness.record_failure(URL, "timeout", now=1301) == 300
+
+
+def test_throttled_probe_closes_the_circuit_and_waits():
+    politeness = make_politeness(failure_threshold=1)
+    politeness.record_failure(URL, "timeout", now=1000)
+    politeness.before_request(URL, now=1300)
+
+    politeness.record_throttle(URL, 429, retry_after="45", now=1300)
+    assert politeness.hosts["example.com"].circuit == CLOSED
+    assert politeness.before_request(URL, now=1320) == (False, 1345)
+
+
+def test_request_budget_is_per_host():
+    politeness = make_politeness(requests_per_second=20, burst=2)
+
+    assert politeness.acquire(URL) == 0
+    assert politeness.acquire(URL) == 0
+    assert politeness.acquire(OTHER_URL) == 0
+    assert politeness.acquire(URL) > 0
+    assert make_politeness().acquire(URL) == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from html_parsing import ElementWatcher, compile_selector, parse_document
+
+pytest.importorskip("lxml")
+
+PAGE = (
+    b'<html><body><div class="header">Tickets</div>'
+    b'<p class="price">Price <div>10 EUR</div> incl. VAT</p>'
+    b'<ul class="list"><li>one</li><li>two</li></ul>'
+    + b'<div class="filler">more content</div>' * 50
+    + b'</body></html>'
+)
+
+
+def extract(markup, selector):
+    element = compile_selector(selector).select(parse_document(markup, parser="lxml"))
+    return None if element is None else element.get_text().strip()
+
+
+@pytest.mark.parametrize("selector", [".price", ".list", "ul", "regex:^pri"])
+def test_early_stop_matches_a_full_lxml_parse_at_any_chunk_boundary(selector):
+    expected = extract(PAGE.decode(), selector)
+    for cut in range(1, len(PAGE)):
+        watcher = ElementWatcher.create([compile_selector(selector)])
+        body = bytearray(PAGE[:cut])
+        if not watcher.feed(body):
+            body.extend(PAGE[cut:])
+            if not watcher.feed(body):
+                continue
+        assert extract(bytes(body).decode(), selector) == expected, cut
+
+
+def test_watcher_needs_the_closing_tag():
+    watcher = ElementWatcher.create([compile_selector(".list")])
+    body = bytearray(b'<html><body><ul class="list"><li>one</li>')
+    assert not watcher.feed(body)
+    body.extend(b'<li>two</li></ul><p>after</p>')
+    assert watcher.feed(body)
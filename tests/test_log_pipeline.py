@@ -0,0 +1,77 @@
+import json
+import logging
+
+from log_pipeline import JsonFormatter, RepeatFilter, site_context
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def make_logger(name, handlers):
+    logger = logging.getLogger(name)
+    logger.handlers = []
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in handlers:
+        logger.addHandler(handler)
+    return logger
+
+
+def test_shared_filter_counts_each_record_once():
+    repeat_filter = RepeatFilter([{"match": "^Next check", "max_per_minute": 4}])
+    file_handler, console_handler = ListHandler(), ListHandler()
+    for handler in (file_handler, console_handler):
+        handler.addFilter(repeat_filter)
+    logger = make_logger("test.repeat.shared", [file_handler, console_handler])
+
+    for index in range(10):
+        logger.info(f"Next check for site {index}")
+    logger.info("Checking site")
+
+    assert len(file_handler.messages) == 5
+    assert file_handler.messages == console_handler.messages
+
+
+def test_suppressed_count_is_reported_once():
+    repeat_filter = RepeatFilter([{"match": "^Next check", "max_per_minute": 60, "burst": 1}])
+    handler = ListHandler()
+    handler.addFilter(repeat_filter)
+    logger = make_logger("test.repeat.count", [handler])
+
+    logger.info("Next check for a")
+    logger.info("Next check for b")
+    repeat_filter.rules[0]["bucket"].tokens = 1
+    logger.info("Next check for c")
+
+    assert handler.messages == ["Next check for a", "Next check for c (1 similar message(s) suppressed)"]
+
+
+def test_sampling_keeps_nothing_at_zero():
+    repeat_filter = RepeatFilter([{"match": "noisy", "sample": 0}])
+    handler = ListHandler()
+    handler.addFilter(repeat_filter)
+    logger = make_logger("test.repeat.sample", [handler])
+
+    logger.info("noisy message")
+    logger.info("quiet message")
+
+    assert handler.messages == ["quiet message"]
+
+
+def test_json_lines_carry_site_context():
+    handler = ListHandler()
+    handler.setFormatter(JsonFormatter())
+    logger = make_logger("test.json", [handler])
+
+    site = {"id": "a", "name": "Site A", "url": "https://example.com/a"}
+    logger.info("Content changed", extra=site_context(site, "changed"))
+
+    entry = json.loads(handler.messages[0])
+    assert entry["message"] == "Content changed"
+    assert (entry["site_id"], entry["site_name"], entry["url"], entry["result"]) == ("a", "Site A", "https://example.com/a", "changed")
@@ -0,0 +1,22 @@
+import time
+
+from notification_queue import NotificationQueue
+
+
+def change(index):
+    return {"site_id": f"site-{index}", "site_name": f"Site {index}", "url": "https://example.com", "old": "a", "new": "b"}
+
+
+def test_full_queue_does_not_block_and_keeps_the_spool(tmp_path):
+    notification_queue = NotificationQueue({}, str(tmp_path), max_size=2, sender=lambda changes, config: None)
+
+    start = time.monotonic()
+    for index in range(5):
+        notification_queue.enqueue(change(index))
+
+    assert time.monotonic() - start < 1
+    metrics = notification_queue.get_metrics()
+    assert metrics["enqueued"] == 5
+    assert metrics["overflowed"] == 3
+    assert metrics["depth"] == 2
+    assert len(list(tmp_path.glob("*.json"))) == 5
@@ -0,0 +1,69 @@
+from scheduler import CheckScheduler
+
+
+def site(site_id, minutes=5):
+    return {"id": site_id, "min_check_interval_minutes": minutes, "max_check_interval_minutes": minutes}
+
+
+def test_pop_due_returns_sites_in_due_order():
+    scheduler = CheckScheduler()
+    scheduler.add_site(site("b"), due=20)
+    scheduler.add_site(site("a"), due=10)
+    scheduler.add_site(site("c"), due=30)
+
+    assert [s["id"] for s in scheduler.pop_due(now=25)] == ["a", "b"]
+    assert scheduler.next_due() == 30
+    assert scheduler.pop_due(now=25) == []
+
+
+def test_reschedule_replaces_pending_entry():
+    scheduler = CheckScheduler()
+    scheduler.add_site(site("a", minutes=1), due=0)
+    scheduler.reschedule("a", now=100)
+
+    assert scheduler.due_time("a") == 160
+    assert scheduler.pop_due(now=150) == []
+    assert [s["id"] for s in scheduler.pop_due(now=160)] == ["a"]
+
+
+def test_removed_site_is_never_due():
+    scheduler = CheckScheduler()
+    scheduler.add_site(site("a"), due=0)
+    scheduler.remove_site("a")
+
+    assert scheduler.pop_due(now=100) == []
+    assert scheduler.next_due() is None
+    assert "a" not in scheduler
+
+
+def test_max_checks_per_second_defers_the_rest():
+    scheduler = CheckScheduler(max_checks_per_second=2)
+    for index in range(5):
+        scheduler.add_site(site(f"s{index}"), due=0)
+
+    assert len(scheduler.pop_due(now=10.0)) == 2
+    assert scheduler.pop_due(now=10.5) == []
+    assert len(scheduler.pop_due(now=11.0)) == 2
+
+
+def test_take_removes_pending_entry():
+    scheduler = CheckScheduler()
+    scheduler.add_site(site("a"), due=50)
+
+    site_config, due = scheduler.take("a")
+    assert site_config["id"] == "a" and due == 50
+    assert scheduler.take("a") is None
+    assert scheduler.pop_due(now=100) == []
+
+
+def test_plan_startup_resumes_recent_and_spreads_overdue():
+    scheduler = CheckScheduler()
+    sites = [site("recent", minutes=10), site("stale", minutes=10), site("new", minutes=10)]
+    now = 10_000
+    resumed, overdue = scheduler.plan_startup(sites, {"recent": now - 60, "stale": now - 3600}, now, warmup_seconds=60)
+
+    assert (resumed, overdue) == (1, 2)
+    assert scheduler.due_time("recent") == now - 60 + 600
+    # Never checked sites go first, then the most overdue
+    assert scheduler.due_time("new") == now
+    assert scheduler.due_time("stale") == now + 30
@@ -0,0 +1,107 @@
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from smtp_pool import SMTPConnectionManager
+from smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink().start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_message(index):
+    msg = EmailMessage()
+    msg["From"] = "monitor@example.com"
+    msg["To"] = "alerts@example.com"
+    msg["Subject"] = f"Change {index}"
+    msg.set_content(f"Body {index}")
+    return msg
+
+
+def wait_for_messages(sink, count, timeout=5):
+    deadline = time.time() + timeout
+    while len(sink.messages) < count and time.time() < deadline:
+        time.sleep(0.01)
+    return len(sink.messages)
+
+
+def test_burst_uses_one_connection_without_health_checks(sink):
+    manager = SMTPConnectionManager(sink.email_config())
+    errors = manager.send_messages([make_message(index) for index in range(5)])
+    manager.close()
+
+    assert errors == [None] * 5
+    assert wait_for_messages(sink, 5) == 5
+    assert sink.connections == 1
+    assert sink.noops == 0
+
+
+def test_reconnects_after_drop_mid_burst(sink):
+    manager = SMTPConnectionManager(sink.email_config(), health_check_after=60)
+    manager.send_message(make_message(0))
+    sink.drop_connections()
+
+    manager.send_message(make_message(1))
+    manager.close()
+
+    assert wait_for_messages(sink, 2) == 2
+    assert sink.connections == 2
+
+
+def test_health_check_only_after_idle(sink):
+    manager = SMTPConnectionManager(sink.email_config(), health_check_after=0.05)
+    manager.send_message(make_message(0))
+    manager.send_message(make_message(1))
+    time.sleep(0.1)
+    manager.send_message(make_message(2))
+    manager.close()
+
+    assert wait_for_messages(sink, 3) == 3
+    assert sink.noops == 1
+    assert sink.connections == 1
+
+
+def test_health_check_replaces_connection_dropped_while_idle(sink):
+    manager = SMTPConnectionManager(sink.email_config(), health_check_after=0.05)
+    manager.send_message(make_message(0))
+    sink.drop_connections()
+    time.sleep(0.1)
+
+    manager.send_message(make_message(1))
+    manager.close()
+
+    assert wait_for_messages(sink, 2) == 2
+    assert sink.connections == 2
+
+
+def test_idle_connection_is_closed(sink):
+    manager = SMTPConnectionManager(sink.email_config(), idle_timeout=0.05)
+    manager.send_message(make_message(0))
+
+    manager.close_if_idle()
+    assert manager.server is not None
+
+    time.sleep(0.1)
+    manager.close_if_idle()
+    assert manager.server is None
+
+    manager.send_message(make_message(1))
+    manager.close()
+    assert wait_for_messages(sink, 2) == 2
+    assert sink.connections == 2
+
+
+def test_keep_alive_off_closes_after_each_batch(sink):
+    manager = SMTPConnectionManager(sink.email_config(), keep_alive=False)
+    manager.send_messages([make_message(0), make_message(1)])
+    assert manager.server is None
+    manager.send_messages([make_message(2)])
+
+    assert wait_for_messages(sink, 3) == 3
+    assert sink.connections == 2
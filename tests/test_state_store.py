@@ -0,0 +1,54 @@
+import pytest
+
+from state_store import JsonStateStore, SQLiteStateStore
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "json":
+        store = JsonStateStore(str(tmp_path))
+    else:
+        store = SQLiteStateStore(str(tmp_path / "state.db"), batch_size=1000, flush_interval=3600)
+    yield store
+    store.close()
+
+
+def test_state_round_trip(store):
+    store.save("a", {"content": "hello", "last_check": "2024-05-01T10:00:00"})
+
+    assert store.load("a")["content"] == "hello"
+    assert store.load("missing") is None
+    assert set(store.load_all(["a", "missing"])) == {"a"}
+
+
+def test_check_records_are_kept_apart_from_states(store):
+    store.save("a", {"content": "hello", "last_check": "2024-05-01T10:00:00"})
+    store.save_check("a", {"last_check": "2024-05-01T10:05:00", "stats": {"checks": 2}})
+    store.save_check("a", {"last_check": "2024-05-01T10:10:00", "stats": {"checks": 3}})
+
+    assert store.load_checks(["a", "b"]) == {"a": {"last_check": "2024-05-01T10:10:00", "stats": {"checks": 3}}}
+    assert store.load("a")["last_check"] == "2024-05-01T10:00:00"
+
+
+def test_sqlite_batches_survive_reopening(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteStateStore(path, batch_size=1000, flush_interval=3600)
+    store.save("a", {"content": "hello"})
+    store.save_check("a", {"last_check": "2024-05-01T10:10:00"})
+    store.close()
+
+    reopened = SQLiteStateStore(path)
+    assert reopened.load("a") == {"content": "hello"}
+    assert reopened.load_checks(["a"]) == {"a": {"last_check": "2024-05-01T10:10:00"}}
+    reopened.close()
+
+
+def test_migration_keeps_the_last_check(tmp_path):
+    json_store = JsonStateStore(str(tmp_path))
+    json_store.save("a", {"content": "hello", "last_check": "2024-05-01T10:00:00"})
+    json_store.save_check("a", {"last_check": "2024-05-01T10:10:00", "stats": {"checks": 3}})
+
+    store = SQLiteStateStore(str(tmp_path / "state.db"), data_dir=str(tmp_path))
+    assert store.load("a")["content"] == "hello"
+    assert store.load_checks(["a"]) == {"a": {"last_check": "2024-05-01T10:10:00", "stats": {"checks": 3}}}
+    store.close()
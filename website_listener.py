@@ -1,54 +1,358 @@
+import argparse
 import requests
 import json
 import time
 import os
+import random
 import logging
-import re
-from logging.handlers import RotatingFileHandler
-from bs4 import BeautifulSoup
+import queue
+from http.cookiejar import DefaultCookiePolicy
+from logging.handlers import QueueListener, RotatingFileHandler
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-from mail_notification import send_email_notification
+from mail_notification import send_email_notifications, resolve_recipients, close_idle_connections, close_connections
+from async_engine import AsyncCheckEngine
+from scheduler import CheckScheduler
+from notification_queue import NotificationQueue
+from digest import DigestBuffer
+from state_store import create_state_store
+from change_history import ChangeHistory
+from body_hash import get_body_hash_config, compute_body_hashes, hashes_match
+from html_parsing import DEFAULT_PARSER, ElementWatcher, compile_selector, parse_document, release_tree, resolve_parser
+from page_reader import CHUNK_SIZE, DEFAULT_MAX_BODY_BYTES, PageBody, read_body
+from diff_engine import compute_diff, render_diff_text
+from sharding import ShardCoordinator, select_sites
+from metrics import MetricsServer, MonitorMetrics
+from config_watcher import ConfigWatcher
+from rate_limit import TokenBucket
+from host_politeness import HostPoliteness, THROTTLE_STATUSES
+from content_cache import CachedContent, compact_content, get_memory_config, truncate_content
+from memory_profile import MemoryProfiler
+from log_pipeline import DEFAULT_RATE_LIMITS, TEXT_FORMAT, DeferredQueueHandler, JsonFormatter, RepeatFilter, change_context, site_context
 
 class WebsiteMonitor:
-    def __init__(self, config_path="config.json"):
+    def __init__(self, config_path="config.json", shards=None, notification_sink=None, notifications_only=False,
+                 trace_memory=False):
         self.config_path = config_path
         self.data_dir = "monitor_data"
+        self.shards = shards or []
+        self.shard_name = "-".join(str(index) for index, count in self.shards if count > 1) or None
+        self.notification_sink = notification_sink
         self.ensure_data_dir_exists()
         self.load_config()
+        if self.shards:
+            self.config["sites"] = select_sites(self.config["sites"], self.shards)
+        self.log_listener = None
         self.setup_logging()
+        self.memory_config = get_memory_config(self.config.get("memory"))
+        self.config_watcher = self.create_config_watcher()
+        self.compiled_selectors = {}
+        self.compile_selectors()
         self.site_states = {}
-        self.load_previous_states()
+        self.site_stats = {}
+        self.state_store = create_state_store(self.config.get("state", {}), self.data_dir)
+        self.history = self.create_history()
+        self.last_history_compaction = 0
+        if not notifications_only:
+            self.load_previous_states()
+        self.session = self.create_session()
+        self.rate_limiter = self.create_rate_limiter()
+        self.politeness = self.create_politeness()
+        self.engine = None if notifications_only else self.create_engine()
+        # Sharded workers hand their changes to the coordinator, which owns delivery and the spool
+        self.notification_queue = None if notification_sink is not None else self.create_notification_queue()
+        self.digest = DigestBuffer()
+        self.scheduler = None
+        self.metrics = self.create_metrics()
+        self.metrics_server = self.create_metrics_server()
+        self.profiler = self.create_profiler(trace_memory)
 
     def setup_logging(self):
+        self.stop_logging()
+        # Closing matters on a reload, a removed file handler would otherwise keep its log file open
         for handler in logging.root.handlers[:]:
             logging.root.removeHandler(handler)
+            handler.close()
         
         logger = logging.getLogger()
         logger.setLevel(logging.INFO)
         
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        formatter = logging.Formatter(TEXT_FORMAT)
         
         log_config = self.config.get("logging", {})
         max_file_size = log_config.get("max_file_size_mb", 5) * 1024 * 1024
         backup_count = log_config.get("backup_count", 3)
         
+        log_file = "website_monitor.log" if self.shard_name is None else f"website_monitor.shard{self.shard_name}.log"
         file_handler = RotatingFileHandler(
-            "website_monitor.log", 
+            log_file, 
             maxBytes=max_file_size,
             backupCount=backup_count,
             encoding='utf-8'
         )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        # JSON lines only go to the file, the console stays readable
+        file_handler.setFormatter(JsonFormatter() if log_config.get("format", "text") == "json" else formatter)
+        handlers = [file_handler]
         
         if log_config.get("console_enabled", True):
             console_handler = logging.StreamHandler()
             console_handler.setFormatter(formatter)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
+        
+        repeat_filter = RepeatFilter(log_config.get("rate_limits", DEFAULT_RATE_LIMITS))
+        if log_config.get("async", False):
+            # Checks only enqueue records, formatting, file I/O and rotation happen on the listener thread
+            log_queue = queue.SimpleQueue()
+            queue_handler = DeferredQueueHandler(log_queue)
+            queue_handler.addFilter(repeat_filter)
+            logger.addHandler(queue_handler)
+            self.log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self.log_listener.start()
+        else:
+            for handler in handlers:
+                handler.addFilter(repeat_filter)
+                logger.addHandler(handler)
         
         log_level = log_config.get("level", "INFO").upper()
         if hasattr(logging, log_level):
             logger.setLevel(getattr(logging, log_level))
+    
+    def stop_logging(self):
+        if self.log_listener is None:
+            return
+        # Stopping the listener writes out everything still queued before its handlers are closed
+        listener = self.log_listener
+        self.log_listener = None
+        for handler in logging.root.handlers[:]:
+            if isinstance(handler, DeferredQueueHandler):
+                logging.root.removeHandler(handler)
+                handler.close()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+    def create_session(self):
+        concurrency_config = self.config.get("concurrency", {})
+        
+        session = requests.Session()
+        # Don't carry cookies between checks, each check stays a fresh request
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        
+        adapter = HTTPAdapter(
+            pool_connections=concurrency_config.get("max_pooled_hosts", 100),
+            pool_maxsize=concurrency_config.get("max_per_host", 2)
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def create_engine(self):
+        concurrency_config = self.config.get("concurrency", {})
+        if not concurrency_config.get("enabled", False):
+            return None
+        
+        return AsyncCheckEngine(
+            self,
+            max_concurrent_checks=concurrency_config.get("max_concurrent_checks", 10),
+            max_per_host=concurrency_config.get("max_per_host", 2)
+        )
+
+    def create_history(self):
+        history_config = self.config.get("history", {})
+        if not history_config.get("enabled", False):
+            return None
+        
+        return ChangeHistory(
+            history_config.get("path", os.path.join(self.data_dir, "history.db")),
+            snapshot_interval=history_config.get("snapshot_interval", 20),
+            max_versions=history_config.get("max_versions", 1000),
+            max_age_days=history_config.get("max_age_days"),
+            cache_content=not self.memory_config["enabled"]
+        )
+    
+    def compact_history(self, force=False):
+        if self.history is None:
+            return
+        
+        now = time.time()
+        if not force and now - self.last_history_compaction < 24 * 60 * 60:
+            return
+        self.last_history_compaction = now
+        
+        try:
+            if self.shard_name is not None:
+                # Other shards compact their own sites
+                for site_id in self.sites_by_id:
+                    self.history.compact(site_id)
+            else:
+                self.history.compact()
+        except Exception as e:
+            logging.error(f"Failed to compact change history: {e}")
+
+    def create_notification_queue(self):
+        queue_config = self.config.get("notification_queue", {})
+        if not queue_config.get("enabled", False) or not self.config.get("email", {}).get("enabled", False):
+            return None
+        
+        return NotificationQueue(
+            self.config,
+            os.path.join(self.data_dir, "notification_spool"),
+            max_size=queue_config.get("max_size", 1000),
+            workers=queue_config.get("workers", 1),
+            max_attempts=queue_config.get("max_attempts", 5),
+            retry_base_delay=queue_config.get("retry_base_delay_seconds", 5),
+            retry_max_delay=queue_config.get("retry_max_delay_seconds", 300),
+            batch_size=queue_config.get("batch_size", 20)
+        )
+
+    def create_metrics(self):
+        metrics_config = self.config.get("metrics", {})
+        # Aggregate series are always kept, they are cheap; per-site series only when the endpoint is on
+        metrics = MonitorMetrics(
+            per_site=metrics_config.get("enabled", False) and metrics_config.get("per_site", True)
+        )
+        
+        registry = metrics.registry
+        registry.gauge("website_monitor_sites", "Sites monitored by this process",
+                       callback=lambda: {(): len(self.config["sites"])})
+        registry.gauge("website_monitor_pending_digests", "Digest groups waiting for their window to end",
+                       callback=lambda: {(): len(self.digest.groups)})
+        registry.gauge("website_monitor_notification_queue", "Notification queue depth and delivery counters", ("metric",),
+                       callback=self.collect_queue_metrics)
+        registry.gauge("website_monitor_host_state", "Per-host politeness state and counters", ("host", "metric"),
+                       callback=self.collect_host_metrics)
+        if metrics.per_site:
+            registry.gauge("website_monitor_site_stats", "Per-site check statistics", ("site", "stat"),
+                           callback=self.collect_site_stats)
+        return metrics
+    
+    def collect_queue_metrics(self):
+        if self.notification_queue is None:
+            return {}
+        return {(key,): value for key, value in self.notification_queue.get_metrics().items()}
+    
+    def collect_host_metrics(self):
+        if self.politeness is None:
+            return {}
+        circuit_values = {"closed": 0, "half_open": 1, "open": 2}
+        values = {}
+        for host, state in self.politeness.snapshot().items():
+            for key, value in state.items():
+                if key == "circuit":
+                    values[(host, "circuit")] = circuit_values[value]
+                elif isinstance(value, (int, float)):
+                    values[(host, key)] = value
+        return values
+    
+    def collect_site_stats(self):
+        return {
+            (site_id, key): value
+            for site_id, stats in list(self.site_stats.items())
+            for key, value in stats.items()
+        }
+    
+    def create_profiler(self, trace_memory):
+        profiler = MemoryProfiler(
+            self.data_dir,
+            top=self.memory_config["trace_top"],
+            frames=self.memory_config["trace_frames"],
+            name=self.shard_name
+        )
+        self.metrics.profiler = profiler
+        if trace_memory:
+            profiler.start()
+        return profiler
+    
+    def create_metrics_server(self):
+        metrics_config = self.config.get("metrics", {})
+        if not metrics_config.get("enabled", False):
+            return None
+        
+        # Each worker process of a sharded monitor serves its own endpoint on the next port up
+        port = metrics_config.get("port", 9464)
+        if len(self.shards) > 1:
+            port += self.shards[-1][0] + 1
+        
+        server = MetricsServer(self.metrics.registry, metrics_config.get("host", "127.0.0.1"), port)
+        try:
+            server.start()
+        except OSError as e:
+            logging.error(f"Failed to start metrics endpoint on port {port}: {e}")
+            return None
+        return server
+
+    def create_config_watcher(self):
+        reload_config = self.config.get("config_reload", {})
+        if not reload_config.get("enabled", True):
+            return None
+        return ConfigWatcher(self.config_path, interval=reload_config.get("interval_seconds", 5))
+    
+    def reload_config(self):
+        if self.config_watcher is None:
+            return
+        new_config = self.config_watcher.poll()
+        if new_config is not None:
+            self.apply_config(new_config)
+    
+    def apply_config(self, new_config):
+        if self.shards:
+            new_config["sites"] = select_sites(new_config["sites"], self.shards)
+        
+        old_sites = self.sites_by_id
+        new_sites = {site_config["id"]: site_config for site_config in new_config["sites"]}
+        added = [site_id for site_id in new_sites if site_id not in old_sites]
+        removed = [site_id for site_id in old_sites if site_id not in new_sites]
+        changed = [site_id for site_id in new_sites if site_id in old_sites and new_sites[site_id] != old_sites[site_id]]
+        
+        for section in ("concurrency", "state", "history", "notification_queue", "metrics", "sharding", "politeness", "memory"):
+            if new_config.get(section) != self.config.get(section):
+                logging.warning(f"Changes to the '{section}' settings take effect after a restart")
+        logging_changed = new_config.get("logging") != self.config.get("logging")
+        scheduling_changed = new_config.get("scheduling") != self.config.get("scheduling")
+        
+        self.config = new_config
+        if self.notification_queue is not None:
+            self.notification_queue.config = new_config
+        if logging_changed:
+            self.setup_logging()
+        
+        self.compiled_selectors = {}
+        self.compile_selectors()
+        now = time.time()
+        
+        for site_id in removed:
+            self.site_states.pop(site_id, None)
+            self.site_stats.pop(site_id, None)
+            if self.scheduler is not None:
+                self.scheduler.remove_site(site_id)
+        
+        for site_id in added:
+            # New sites pick up where they left off if they were monitored before
+            site_state = self.apply_check(self.state_store.load(site_id), self.state_store.load_checks([site_id]).get(site_id))
+            self.site_states[site_id] = self.compact_state(site_state) if site_state else {"content": None, "last_check": None}
+            self.site_stats[site_id] = (site_state or {}).get("stats", {})
+            if self.scheduler is not None:
+                self.scheduler.add_site(new_sites[site_id], due=now)
+        
+        for site_id in changed:
+            old_site, new_site = old_sites[site_id], new_sites[site_id]
+            if self.scheduler is None:
+                continue
+            self.scheduler.update_site(new_site)
+            
+            if old_site["url"] != new_site["url"] or old_site["css_selector"] != new_site["css_selector"]:
+                # The old content came from a different page or element, start over with a new baseline
+                self.site_states[site_id] = {"content": None, "last_check": None}
+                self.scheduler.schedule(site_id, now)
+            elif any(old_site.get(key) != new_site.get(key) for key in ("min_check_interval_minutes", "max_check_interval_minutes")):
+                self.scheduler.reschedule(site_id, now)
+        
+        if scheduling_changed:
+            if self.scheduler is not None:
+                self.scheduler.max_checks_per_second = self.config.get("scheduling", {}).get("max_checks_per_second")
+            self.rate_limiter = self.create_rate_limiter()
+        
+        logging.info(f"Configuration reloaded: {len(added)} site(s) added, {len(removed)} removed, {len(changed)} changed")
 
     def load_config(self):
         try:
@@ -67,144 +371,591 @@ class WebsiteMonitor:
             os.makedirs(self.data_dir)
             logging.info(f"Created data directory: {self.data_dir}")
     
-    def get_site_state_path(self, site_id):
-        return os.path.join(self.data_dir, f"{site_id}.json")
-    
-
     def load_previous_states(self):
-        for site_config in self.config["sites"]:
-            site_id = site_config["id"]
-            state_path = self.get_site_state_path(site_id)
-            
-            if os.path.exists(state_path):
-                try:
-                    with open(state_path, 'r') as f:
-                        site_state = json.load(f)
-                        self.site_states[site_id] = site_state
-                        logging.info(f"Loaded previous state for site: {site_id}")
-                except Exception as e:
-                    logging.error(f"Failed to load previous state for site {site_id}: {e}")
-                    self.site_states[site_id] = {"content": None, "last_check": None}
+        site_ids = [site_config["id"] for site_config in self.config["sites"]]
+        states = self.state_store.load_all(site_ids)
+        checks = self.state_store.load_checks(site_ids)
+        
+        for site_id in site_ids:
+            site_state = self.apply_check(states.get(site_id), checks.get(site_id))
+            if site_state is not None:
+                self.site_states[site_id] = self.compact_state(site_state)
+                self.site_stats[site_id] = site_state.get("stats", {})
+                logging.debug(f"Loaded previous state for site: {site_id}")
             else:
                 self.site_states[site_id] = {"content": None, "last_check": None}
-                logging.info(f"No previous state found for site: {site_id}")
+                logging.debug(f"No previous state found for site: {site_id}")
+        
+        logging.info(f"Loaded previous state for {len(states)} of {len(site_ids)} site(s)")
     
-    def save_site_state(self, site_id, content):
-        state_path = self.get_site_state_path(site_id)
+    def get_last_checks(self):
+        last_checks = {}
+        for site_id, site_state in self.site_states.items():
+            try:
+                last_checks[site_id] = datetime.fromisoformat(site_state["last_check"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                last_checks[site_id] = None
+        return last_checks
+    
+    def create_rate_limiter(self):
+        scheduling_config = self.config.get("scheduling", {})
+        rate = scheduling_config.get("max_requests_per_second")
+        if not rate:
+            return None
         
+        # The budget is for the whole deployment, each shard gets an equal share of it
+        shares = 1
+        for _, count in self.shards:
+            shares *= max(1, count)
+        return TokenBucket(rate / shares, burst=scheduling_config.get("request_burst"))
+    
+    def create_politeness(self):
+        politeness_config = self.config.get("politeness", {})
+        if not politeness_config.get("enabled", True):
+            return None
+        return HostPoliteness(
+            requests_per_second=politeness_config.get("requests_per_second"),
+            burst=politeness_config.get("burst"),
+            backoff_base=politeness_config.get("backoff_base_seconds", 60),
+            backoff_max=politeness_config.get("backoff_max_seconds", 3600),
+            failure_threshold=politeness_config.get("failure_threshold", 5),
+            open_seconds=politeness_config.get("circuit_open_seconds", 300),
+            probe_timeout=politeness_config.get("probe_timeout_seconds", 120)
+        )
+    
+    def get_site_option(self, site_config, key, default=None):
+        return site_config.get(key, self.config.get(key, default))
+    
+    def get_diff_options(self, site_config):
+        options = dict(self.config.get("diff", {}))
+        options.update(site_config.get("diff", {}))
+        return options
+    
+    def get_site_stats(self, site_id):
+        stats = self.site_stats.setdefault(site_id, {})
+        stats.setdefault("checks", 0)
+        stats.setdefault("not_modified", 0)
+        stats.setdefault("body_hash_checks", 0)
+        stats.setdefault("body_hash_hits", 0)
+        stats.setdefault("deferred", 0)
+        stats.setdefault("throttled", 0)
+        stats.setdefault("request_failures", 0)
+        stats.setdefault("truncated", 0)
+        return stats
+    
+    def compact_state(self, state):
+        # In bounded mode large contents stay in memory only as a digest and a capped copy
+        if not self.memory_config["enabled"]:
+            return state
+        return dict(state, content=compact_content(state.get("content"), self.memory_config))
+    
+    def resolve_content(self, site_id, content):
+        if not isinstance(content, CachedContent):
+            return content
+        text = content.text()
+        if text is None:
+            stored = self.state_store.load(site_id) or {}
+            text = stored.get("content")
+            if text is None or not content.matches(text):
+                logging.warning(f"Stored content for site {site_id} doesn't match the cached digest")
+        return text
+    
+    def truncate_for_notification(self, content):
+        if not self.memory_config["enabled"]:
+            return content
+        return truncate_content(content, self.memory_config["max_notification_chars"])
+    
+    def save_site_state(self, site_id, content, metadata=None):
+        content = self.resolve_content(site_id, content)
         state = {
             "content": content,
             "last_check": datetime.now().isoformat()
         }
+        if metadata:
+            state.update(metadata)
+        state["stats"] = self.get_site_stats(site_id)
         
-        try:
-            with open(state_path, 'w') as f:
-                json.dump(state, f, indent=4)
+        with self.metrics.stage("state_save", site_id):
+            try:
+                self.state_store.save(site_id, state)
+                self.site_states[site_id] = self.compact_state(state)
+                logging.debug(f"Saved state for site: {site_id}")
+            except Exception as e:
+                logging.error(f"Failed to save state for site {site_id}: {e}")
             
-            self.site_states[site_id] = state
-            logging.debug(f"Saved state for site: {site_id}")
-        except Exception as e:
-            logging.error(f"Failed to save state for site {site_id}: {e}")
+            if self.history is not None:
+                try:
+                    self.history.record(site_id, content)
+                except Exception as e:
+                    logging.error(f"Failed to record history for site {site_id}: {e}")
+    
+    def compile_selectors(self):
+        self.sites_by_id = {site_config["id"]: site_config for site_config in self.config["sites"]}
+        self.fetch_groups = {}
+        for site_config in self.config["sites"]:
+            for selector in self.get_selectors(site_config):
+                self.get_compiled_selector(selector)
+            self.fetch_groups.setdefault(self.get_fetch_key(site_config), []).append(site_config["id"])
+    
+    def get_compiled_selector(self, css_selector):
+        selector = self.compiled_selectors.get(css_selector)
+        if selector is None:
+            selector = compile_selector(css_selector)
+            self.compiled_selectors[css_selector] = selector
+        return selector
     
     def find_element_by_selector(self, soup, css_selector):
-        try:
-            element = soup.select_one(css_selector)
-            if element:
-                return element
-        except Exception:
-            pass
-        
-        is_regex = css_selector.startswith('regex:')
-        if is_regex:
-            regex_pattern = css_selector[6:]
-            try:
-                compiled_regex = re.compile(regex_pattern)
-                for element in soup.find_all():
-                    if element.get('class'):
-                        class_str = ' '.join(element.get('class'))
-                        if compiled_regex.search(class_str):
-                            return element
-            except re.error as e:
-                logging.error(f"Invalid regex pattern '{regex_pattern}': {e}")
-        
-        return None
+        return self.get_compiled_selector(css_selector).select(soup)
 
+    def get_fetch_key(self, site_config):
+        headers = site_config.get("headers", {})
+        return site_config["url"], tuple(sorted(headers.items()))
+    
+    def group_sites(self, site_configs):
+        groups = {}
+        for site_config in site_configs:
+            groups.setdefault(self.get_fetch_key(site_config), []).append(site_config)
+        return list(groups.values())
+    
+    def get_selectors(self, site_config):
+        css_selector = site_config["css_selector"]
+        return css_selector if isinstance(css_selector, list) else [css_selector]
+    
     def check_website(self, site_config):
-        site_id = site_config["id"]
-        site_name = site_config.get("name", site_id)
-        quiet_mode = self.config.get("logging", {}).get("quiet_mode", False)
+        _, changed, change_info = self.check_group([site_config])[0]
+        return changed, change_info
+    
+    def check_group(self, site_configs):
+        with self.metrics.check_seconds.time():
+            results = self.check_fetch_group(site_configs)
+        for site_config in site_configs:
+            self.save_check(site_config["id"])
+        return results
+    
+    def save_check(self, site_id):
+        # Written after every check, so a restart resumes the schedule and stats even for sites that never change
+        checked_at = datetime.now().isoformat()
+        record = {"last_check": checked_at, "stats": dict(self.get_site_stats(site_id))}
+        try:
+            self.state_store.save_check(site_id, record)
+        except Exception as e:
+            logging.error(f"Failed to save last check for site {site_id}: {e}")
+        state = self.site_states.get(site_id)
+        if state is not None:
+            state["last_check"] = checked_at
+    
+    def apply_check(self, site_state, record):
+        if not record:
+            return site_state
+        state = dict(site_state or {"content": None})
+        state["last_check"] = record.get("last_check")
+        state["stats"] = record.get("stats", state.get("stats", {}))
+        return state
+    
+    def check_fetch_group(self, site_configs):
+        # All sites in a group share one URL and headers: one request, one parse, separate change detection
+        site_ids = [site_config["id"] for site_config in site_configs]
+        names = ", ".join(site_config.get("name", site_config["id"]) for site_config in site_configs)
         
         try:
-            url = site_config["url"]
-            headers = site_config.get("headers", {})
-            css_selector = site_config["css_selector"]
+            outcome, page = self.fetch_group(site_configs, names)
+            if page is None:
+                for site_id in site_ids:
+                    self.metrics.count_check(outcome, site_id)
+                return [(site_config, False, None) for site_config in site_configs]
             
-            if not quiet_mode:
-                logging.info(f"Checking site: {site_name} ({url})")
-            else:
-                logging.debug(f"Checking site: {site_name} ({url})")
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                element = self.find_element_by_selector(soup, css_selector)
-                
-                if element is None:
-                    logging.warning(f"Element with selector '{css_selector}' not found on {site_name}")
-                    current_content = "<Element not found>"
-                else:
-                    current_content = element.get_text().strip()
+            extracted = self.extract_contents(site_configs, page)
+        except Exception as e:
+            logging.error(f"Error checking website {names}: {e}", extra=site_context(site_configs))
+            for site_id in site_ids:
+                self.metrics.count_check("error", site_id)
+            return [(site_config, False, None) for site_config in site_configs]
+        
+        results = []
+        for site_config in site_configs:
+            site_name = site_config.get("name", site_config["id"])
+            try:
+                current_content, metadata = extracted[site_config["id"]]
+                if current_content is None:
+                    # The element wasn't in the part that was read, keep the previous value instead of reporting it as missing
+                    self.metrics.count_check("too_large" if page.truncated else "incomplete", site_config["id"])
+                    results.append((site_config, False, None))
+                    continue
+                changed, change_info = self.detect_change(site_config, current_content, metadata)
+            except Exception as e:
+                logging.error(f"Error checking website {site_name}: {e}", extra=site_context(site_config))
+                self.metrics.count_check("error", site_config["id"])
+                changed, change_info = False, None
+            results.append((site_config, changed, change_info))
+        return results
+    
+    def get_conditional_headers(self, site_configs):
+        states = [self.site_states.get(site_config["id"]) or {} for site_config in site_configs]
+        if any(state.get("content") is None for state in states):
+            return {}
+        if not all(self.get_site_option(site_config, "conditional_requests", True) for site_config in site_configs):
+            return {}
+        
+        # A validator is only safe to send when every site in the group was saved from the same response
+        headers = {}
+        for key, header in (("etag", "If-None-Match"), ("last_modified", "If-Modified-Since")):
+            values = {state.get(key) for state in states}
+            if len(values) == 1 and None not in values:
+                headers[header] = values.pop()
+        return headers
+    
+    def fetch_group(self, site_configs, names):
+        first = site_configs[0]
+        url = first["url"]
+        site_ids = [site_config["id"] for site_config in site_configs]
+        all_stats = [self.get_site_stats(site_id) for site_id in site_ids]
+        quiet_mode = self.config.get("logging", {}).get("quiet_mode", False)
+        
+        if self.politeness is not None:
+            allowed, retry_at = self.politeness.before_request(url)
+            if not allowed:
+                for stats in all_stats:
+                    stats["deferred"] += 1
+                logging.debug(f"Deferred check for {names}, host is backing off until {datetime.fromtimestamp(retry_at).strftime('%H:%M:%S')}", extra=site_context(site_configs))
+                return "deferred", None
+        
+        if not quiet_mode:
+            logging.info(f"Checking site: {names} ({url})", extra=site_context(site_configs))
+        else:
+            logging.debug(f"Checking site: {names} ({url})", extra=site_context(site_configs))
+        
+        for stats in all_stats:
+            stats["checks"] += 1
+        
+        conditional_headers = self.get_conditional_headers(site_configs)
+        request_headers = dict(first.get("headers", {}))
+        request_headers.update(conditional_headers)
+        
+        if self.rate_limiter is not None:
+            self.metrics.observe_stage("rate_limit", self.rate_limiter.acquire(), site_ids)
+        if self.politeness is not None:
+            self.metrics.observe_stage("rate_limit", self.politeness.acquire(url), site_ids)
+        
+        try:
+            response = self.session.get(url, headers=request_headers, stream=True, timeout=self.get_site_option(first, "timeout_seconds", 30))
+        except requests.RequestException as e:
+            for stats in all_stats:
+                stats["request_failures"] += 1
+            if self.politeness is not None:
+                self.politeness.record_failure(url, type(e).__name__)
+            raise
+        
+        # elapsed covers DNS, connect and waiting for the headers, the body is read separately below
+        self.metrics.observe_stage("connect", response.elapsed.total_seconds(), site_ids)
+        
+        try:
+            return self.read_response(site_configs, names, response, conditional_headers)
+        finally:
+            response.close()
+    
+    def read_response(self, site_configs, names, response, conditional_headers):
+        url = site_configs[0]["url"]
+        site_ids = [site_config["id"] for site_config in site_configs]
+        all_stats = [self.get_site_stats(site_id) for site_id in site_ids]
+        quiet_mode = self.config.get("logging", {}).get("quiet_mode", False)
+        
+        if response.status_code != 200:
+            # Only the status is used, reading a small body lets the connection go back to the pool
+            read_body(response, CHUNK_SIZE)
+        
+        if self.politeness is not None:
+            if response.status_code in THROTTLE_STATUSES:
+                # Throttling says nothing about the content, keep the previous value and back off
+                for stats in all_stats:
+                    stats["throttled"] += 1
+                self.politeness.record_throttle(url, response.status_code, response.headers.get("Retry-After"))
+                return "throttled", None
+            if response.status_code >= 500:
+                for stats in all_stats:
+                    stats["request_failures"] += 1
+                self.politeness.record_failure(url, f"HTTP {response.status_code}")
             else:
-                current_content = f"Status Code: {response.status_code}"
-            
-            previous_content = None if site_id not in self.site_states else self.site_states[site_id]["content"]
-            
-            if previous_content is None:
-                self.save_site_state(site_id, current_content)
-                logging.info(f"Initial content for {site_name}: '{current_content}'")
-                return False, None
-            
-            if current_content != previous_content:
-                old_content = previous_content
-                self.save_site_state(site_id, current_content)
-                logging.info(f"Content changed on {site_name} from '{old_content}' to '{current_content}'")
-                return True, {
-                    "site_id": site_id, 
-                    "site_name": site_name,
-                    "url": url,
-                    "old": old_content, 
-                    "new": current_content,
-                    "recipients": site_config.get("recipients", site_config.get("recipients"))
-                }
-            
+                self.politeness.record_success(url)
+        
+        if response.status_code == 304 and conditional_headers:
+            for stats in all_stats:
+                stats["not_modified"] += 1
             if not quiet_mode:
-                logging.debug(f"No changes detected for {site_name}")
-            return False, None
-            
-        except Exception as e:
-            logging.error(f"Error checking website {site_name}: {e}")
+                logging.debug(f"Not modified (304) for {names}, skipped parsing ({all_stats[0]['not_modified']}/{all_stats[0]['checks']} checks saved)", extra=site_context(site_configs))
+            return "not_modified", None
+        
+        if response.status_code != 200:
+            return "fetched", PageBody(response)
+        
+        max_bytes = max(self.get_site_option(site_config, "max_body_bytes", DEFAULT_MAX_BODY_BYTES) for site_config in site_configs)
+        with self.metrics.stage("download", site_ids):
+            page = read_body(response, max_bytes, self.create_element_watcher(site_configs))
+        
+        if page.truncated:
+            for stats in all_stats:
+                stats["truncated"] += 1
+            logging.warning(f"Stopped reading {url} for {names} after {len(page.content)} bytes (max_body_bytes)", extra=site_context(site_configs))
+        elif page.stopped_early and not quiet_mode:
+            logging.debug(f"Stopped reading {url} after {len(page.content)} bytes, the watched elements were complete", extra=site_context(site_configs))
+        return "fetched", page
+    
+    def create_element_watcher(self, site_configs):
+        # Stopping early is only safe when nothing needs the rest of the page
+        for site_config in site_configs:
+            if not self.get_site_option(site_config, "early_stop", True):
+                return None
+            if get_body_hash_config(self.get_site_option(site_config, "body_hash", False))["enabled"]:
+                return None
+            # The watcher decides where an element ends by lxml's rules; another parser may nest it differently
+            if resolve_parser(self.get_site_option(site_config, "parser", DEFAULT_PARSER)) != "lxml":
+                return None
+        
+        selectors = {}
+        for site_config in site_configs:
+            for selector in self.get_selectors(site_config):
+                selectors[selector] = self.get_compiled_selector(selector)
+        return ElementWatcher.create(list(selectors.values()))
+    
+    def extract_contents(self, site_configs, response):
+        if response.status_code != 200:
+            content = f"Status Code: {response.status_code}"
+            return {site_config["id"]: (content, {}) for site_config in site_configs}
+        
+        quiet_mode = self.config.get("logging", {}).get("quiet_mode", False)
+        base_metadata = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+        body_hashes = {}
+        soups = {}
+        extracted = {}
+        
+        try:
+            for site_config in site_configs:
+                site_id = site_config["id"]
+                site_name = site_config.get("name", site_id)
+                css_selector = site_config["css_selector"]
+                selectors = self.get_selectors(site_config)
+                previous_state = self.site_states.get(site_id) or {}
+                previous_content = previous_state.get("content")
+                stats = self.get_site_stats(site_id)
+                metadata = dict(base_metadata)
+                
+                body_hash_config = get_body_hash_config(self.get_site_option(site_config, "body_hash", False))
+                if body_hash_config["enabled"]:
+                    patterns = tuple(body_hash_config["normalize_patterns"])
+                    hashes = body_hashes.get(patterns)
+                    if hashes is None:
+                        hashes = compute_body_hashes(response.content, response.text, patterns)
+                        body_hashes[patterns] = hashes
+                    metadata.update(hashes)
+                    metadata["body_hash_selector"] = css_selector
+                    
+                    if previous_content is not None and previous_state.get("body_hash_selector") == css_selector:
+                        stats["body_hash_checks"] += 1
+                        body_unchanged = hashes_match(previous_state, hashes)
+                        if body_unchanged:
+                            stats["body_hash_hits"] += 1
+                        stats["body_hash_hit_rate"] = round(stats["body_hash_hits"] / stats["body_hash_checks"], 3)
+                        
+                        if body_unchanged:
+                            if not quiet_mode:
+                                logging.debug(f"Body hash unchanged for {site_name}, skipped parsing (hit rate {stats['body_hash_hit_rate']:.0%})", extra=site_context(site_config))
+                            extracted[site_id] = (previous_content, metadata)
+                            continue
+                
+                # Sites with the same parser share one tree; a partial parse only fits a single selector
+                parser = self.get_site_option(site_config, "parser", DEFAULT_PARSER)
+                partial = self.get_site_option(site_config, "partial_parse", False) and len(selectors) == 1
+                parse_key = (parser, selectors[0] if partial else None)
+                soup = soups.get(parse_key)
+                if soup is None:
+                    with self.metrics.stage("parse", site_id):
+                        soup = parse_document(
+                            response.text,
+                            parser=parser,
+                            selector=self.get_compiled_selector(selectors[0]) if partial else None,
+                            partial=partial
+                        )
+                    soups[parse_key] = soup
+                
+                texts = []
+                with self.metrics.stage("select", site_id):
+                    for selector in selectors:
+                        element = self.find_element_by_selector(soup, selector)
+                        if element is None and (response.truncated or response.stopped_early):
+                            logging.warning(f"Element with selector '{selector}' not found in the first {len(response.content)} bytes of {site_name}", extra=site_context(site_config))
+                            texts = None
+                            break
+                        if element is None:
+                            logging.warning(f"Element with selector '{selector}' not found on {site_name}", extra=site_context(site_config))
+                            texts.append("<Element not found>")
+                        else:
+                            texts.append(element.get_text().strip())
+                extracted[site_id] = ("\n".join(texts) if texts is not None else None, metadata)
+        finally:
+            # Parse trees are full of reference cycles, breaking them frees the memory now instead of at the next full GC
+            if self.memory_config["enabled"] and self.memory_config["release_parse_trees"]:
+                for soup in soups.values():
+                    release_tree(soup)
+        
+        return extracted
+    
+    def detect_change(self, site_config, current_content, metadata):
+        site_id = site_config["id"]
+        site_name = site_config.get("name", site_id)
+        quiet_mode = self.config.get("logging", {}).get("quiet_mode", False)
+        previous_state = self.site_states.get(site_id) or {}
+        previous_content = previous_state.get("content")
+        
+        if previous_content is None:
+            self.save_site_state(site_id, current_content, metadata)
+            logging.info(f"Initial content for {site_name}: '{self.truncate_for_notification(current_content)}'", extra=site_context(site_config, "initial"))
+            self.metrics.count_check("initial", site_id)
             return False, None
+        
+        unchanged = previous_content.matches(current_content) if isinstance(previous_content, CachedContent) else current_content == previous_content
+        if not unchanged:
+            old_content = self.resolve_content(site_id, previous_content)
+            self.save_site_state(site_id, current_content, metadata)
+            logging.info(f"Content changed on {site_name} from '{self.truncate_for_notification(old_content)}' to '{self.truncate_for_notification(current_content)}'", extra=site_context(site_config, "changed"))
+            self.metrics.count_check("changed", site_id)
+            with self.metrics.stage("diff", site_id):
+                diff = compute_diff(old_content, current_content, self.get_diff_options(site_config))
+            return True, {
+                "site_id": site_id, 
+                "site_name": site_name,
+                "url": site_config["url"],
+                "old": self.truncate_for_notification(old_content), 
+                "new": self.truncate_for_notification(current_content),
+                "diff": diff,
+                "recipients": site_config.get("recipients", site_config.get("recipients")),
+                "templates": site_config.get("email_templates")
+            }
+        
+        if any(previous_state.get(key) != value for key, value in metadata.items()):
+            self.save_site_state(site_id, current_content, metadata)
+        
+        if not quiet_mode:
+            logging.debug(f"No changes detected for {site_name}", extra=site_context(site_config, "unchanged"))
+        self.metrics.count_check("unchanged", site_id)
+        return False, None
+    
+    def check_sites(self, site_configs):
+        groups = self.group_sites(site_configs)
+        if self.engine is not None:
+            return self.engine.check_groups(groups)
+        
+        results = []
+        for group in groups:
+            results.extend(self.check_group(group))
+        return results
     
     def send_notification(self, change_info):
+        self.send_notifications([change_info])
+    
+    def get_digest_window(self, site_id):
+        site_config = self.sites_by_id.get(site_id, {})
+        window_minutes = site_config.get("digest_window_minutes", self.config.get("email", {}).get("digest_window_minutes"))
+        return window_minutes * 60 if window_minutes else None
+    
+    def send_notifications(self, change_infos):
+        if not change_infos:
+            return
+        
+        with self.metrics.stage("notify"):
+            self.dispatch_notifications(change_infos)
+    
+    def dispatch_notifications(self, change_infos):
+        if self.notification_sink is not None:
+            self.notification_sink.put(change_infos)
+            self.metrics.notifications.inc("sink", amount=len(change_infos))
+            logging.debug(f"Passed {len(change_infos)} change(s) to the notification sink")
+            return
+        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        site_name = change_info["site_name"]
-        url = change_info["url"]
+        for change_info in change_infos:
+            notification_message = f"[{timestamp}] Change detected on {change_info['site_name']}!\n"
+            notification_message += f"URL: {change_info['url']}\n"
+            diff = change_info.get("diff") or compute_diff(change_info["old"], change_info["new"])
+            notification_message += render_diff_text(diff)
+            
+            print("\n" + "!" * 50)
+            print(notification_message)
+            print("!" * 50 + "\n")
         
-        notification_message = f"[{timestamp}] Change detected on {site_name}!\n"
-        notification_message += f"URL: {url}\n"
-        notification_message += f"{change_info['new']}"
+        if "email" not in self.config or not self.config["email"]["enabled"]:
+            self.metrics.notifications.inc("console", amount=len(change_infos))
+            for change_info in change_infos:
+                logging.info(f"Notification sent for {change_info['site_name']}", extra=change_context(change_info))
+            return
         
-        print("\n" + "!" * 50)
-        print(notification_message)
-        print("!" * 50 + "\n")
+        immediate = []
+        for change_info in change_infos:
+            digest_window = self.get_digest_window(change_info["site_id"])
+            if digest_window:
+                recipients = resolve_recipients(change_info.get("recipients"), self.config["email"])
+                self.digest.add(change_info, recipients, digest_window)
+                self.metrics.notifications.inc("digest")
+                logging.info(f"Notification for {change_info['site_name']} added to digest", extra=change_context(change_info))
+            else:
+                immediate.append(change_info)
         
-        if "email" in self.config and self.config["email"]["enabled"]:
-            try:
-                send_email_notification(change_info, self.config)
-            except Exception as e:
-                logging.error(f"Failed to send email notification: {e}")
+        if immediate:
+            self.metrics.notifications.inc("queue" if self.notification_queue is not None else "email", amount=len(immediate))
+        self.deliver_emails(immediate)
+    
+    def deliver_emails(self, notifications):
+        if not notifications:
+            return
+        
+        if self.notification_queue is not None:
+            for notification in notifications:
+                self.notification_queue.enqueue(notification)
+                logging.info(f"Notification queued for {notification['site_name']}", extra=change_context(notification))
+            return
         
-        logging.info(f"Notification sent for {site_name}")
+        try:
+            for notification, e in send_email_notifications(notifications, self.config):
+                logging.error(f"Failed to send email notification for {notification['site_name']}: {e}", extra=change_context(notification))
+        except Exception as e:
+            logging.error(f"Failed to send email notification: {e}")
+        
+        for notification in notifications:
+            logging.info(f"Notification sent for {notification['site_name']}", extra=change_context(notification))
+    
+    def add_fetch_peers(self, due_entries, now):
+        # Sites sharing a URL that are due soon are checked now, so the page is fetched once for all of them
+        window = self.config.get("scheduling", {}).get("dedup_window_seconds", 60)
+        if not window:
+            return due_entries
+        
+        selected = {site_config["id"] for site_config, _ in due_entries}
+        peers = []
+        for site_config, _ in due_entries:
+            for peer_id in self.fetch_groups.get(self.get_fetch_key(site_config), ()):
+                if peer_id in selected:
+                    continue
+                due = self.scheduler.due_time(peer_id)
+                if due is not None and due - now <= window:
+                    peers.append(self.scheduler.take(peer_id))
+                    selected.add(peer_id)
+        return due_entries + peers
+    
+    def defer_for_host(self, site_config):
+        if self.politeness is None:
+            return
+        retry_at = self.politeness.retry_time(site_config["url"])
+        due = self.scheduler.due_time(site_config["id"])
+        if retry_at is not None and due is not None and retry_at > due:
+            # Spread the sites of a backed-off host a little so they don't all return at the same instant
+            self.scheduler.schedule(site_config["id"], retry_at + random.uniform(0, 5))
+    
+    def flush_digests(self, flush_all=False):
+        digests = self.digest.pop_due(flush_all=flush_all)
+        for digest in digests:
+            logging.info(f"Sending digest with {digest['change_count']} change(s) for {digest['site_name']}")
+        self.deliver_emails(digests)
     
     def run(self):
         try:
@@ -215,70 +966,129 @@ class WebsiteMonitor:
             if quiet_mode:
                 logging.info("Running in quiet mode - reduced console output")
             
-            logging.info("Performing initial startup checks...")
-            for site_config in self.config["sites"]:
-                site_name = site_config.get("name", site_config["id"])
-                logging.info(f"Startup check for {site_name}")
-                changed, change_info = self.check_website(site_config)
-                if changed:
-                    self.send_notification(change_info)
+            if self.notification_queue is not None:
+                self.notification_queue.start()
             
-            logging.info("Startup checks complete. Beginning regular monitoring...")
+            if self.profiler.install_signal_handler():
+                logging.debug(f"Send SIGUSR1 to process {os.getpid()} to start memory tracing, again to write a report")
             
-            next_checks = {}
+            scheduling_config = self.config.get("scheduling", {})
+            self.scheduler = CheckScheduler(
+                max_checks_per_second=scheduling_config.get("max_checks_per_second")
+            )
             last_intervals = {}
             
-            for site in self.config["sites"]:
-                next_checks[site["id"]] = 0
-                last_intervals[site["id"]] = None
+            warmup_seconds = scheduling_config.get("warmup_seconds", 60)
+            resumed, overdue = self.scheduler.plan_startup(
+                self.config["sites"], self.get_last_checks(), time.time(), warmup_seconds
+            )
+            logging.info(f"Resumed the schedule of {resumed} site(s), spreading {overdue} overdue check(s) over {warmup_seconds} seconds")
+            
+            # Sites whose check is running on the engine; they are rescheduled when their result comes in
+            in_flight = set()
             
             while True:
                 current_time = time.time()
+                due_entries = self.add_fetch_peers(self.scheduler.pop_due_entries(current_time), current_time)
+                due_entries = [(site_config, due) for site_config, due in due_entries if site_config["id"] not in in_flight]
+                due_sites = [site_config for site_config, _ in due_entries]
+                for _, due in due_entries:
+                    self.metrics.scheduler_lag.observe(max(0.0, current_time - due))
+                changes = []
+                
+                if self.engine is not None:
+                    # Due checks start as slots free up; a slow host only holds up its own sites
+                    for group in self.group_sites(due_sites):
+                        self.engine.submit(group)
+                        in_flight.update(site_config["id"] for site_config in group)
+                    results = self.engine.collect()
+                    checked_at = time.time()
+                else:
+                    results = self.check_sites(due_sites)
+                    checked_at = current_time
                 
-                for site_config in self.config["sites"]:
+                for site_config, changed, change_info in results:
                     site_id = site_config["id"]
                     site_name = site_config.get("name", site_id)
+                    in_flight.discard(site_id)
                     
-                    if current_time >= next_checks[site_id]:
-                        changed, change_info = self.check_website(site_config)
-                        if changed:
-                            self.send_notification(change_info)
-                        
-                        min_interval = site_config.get("min_check_interval_minutes", 5)
-                        max_interval = site_config.get("max_check_interval_minutes", min_interval * 2)
-                        
-                        if max_interval < min_interval:
-                            max_interval = min_interval
-                        
-                        import random
-                        interval_minutes = random.uniform(min_interval, max_interval)
-                        check_interval = interval_minutes * 60
-                        
-                        next_checks[site_id] = current_time + check_interval
-                        
-                        if last_intervals[site_id] != interval_minutes:
-                            last_intervals[site_id] = interval_minutes
-                            if not quiet_mode:
-                                logging.info(f"Next check for {site_name} in {interval_minutes:.2f} minutes")
-                            else:
-                                logging.debug(f"Next check for {site_name} in {interval_minutes:.2f} minutes")
+                    if changed:
+                        changes.append(change_info)
+                    
+                    interval_minutes = self.scheduler.reschedule(site_id, checked_at)
+                    self.defer_for_host(site_config)
+                    
+                    if interval_minutes is not None and last_intervals.get(site_id) != interval_minutes:
+                        last_intervals[site_id] = interval_minutes
+                        if not quiet_mode:
+                            logging.info(f"Next check for {site_name} in {interval_minutes:.2f} minutes", extra=site_context(site_config))
+                        else:
+                            logging.debug(f"Next check for {site_name} in {interval_minutes:.2f} minutes", extra=site_context(site_config))
+                
+                self.state_store.flush()
+                self.compact_history()
+                self.send_notifications(changes)
+                self.flush_digests()
+                close_idle_connections()
+                self.reload_config()
                 
-                min_next_check = min(next_checks.values())
-                wait_time = max(1, min_next_check - time.time())
+                next_due = self.scheduler.next_due()
+                next_reload = self.config_watcher.next_check if self.config_watcher is not None else None
+                wake_times = [t for t in (next_due, self.digest.next_flush(), next_reload) if t is not None]
+                wait_time = max(1, min(wake_times) - time.time()) if wake_times else 1
                 
-                if not quiet_mode:
-                    next_site_id = min(next_checks, key=next_checks.get)
-                    next_site_name = next((site.get("name", site["id"]) for site in self.config["sites"] if site["id"] == next_site_id), next_site_id)
+                if not quiet_mode and next_due is not None:
+                    next_site = self.scheduler.peek()
+                    next_site_name = next_site.get("name", next_site["id"])
                     logging.debug(f"Sleeping for {wait_time:.2f} seconds until next check ({next_site_name})")
                 
-                time.sleep(wait_time)
+                if in_flight:
+                    self.engine.wait(wait_time)
+                else:
+                    time.sleep(wait_time)
             
         except KeyboardInterrupt:
             logging.info("Monitoring stopped by user")
         except Exception as e:
             logging.error(f"Error in monitor: {e}")
             raise
+        finally:
+            self.shutdown()
+    
+    def shutdown(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.engine is not None:
+            self.engine.close()
+        self.flush_digests(flush_all=True)
+        if self.notification_queue is not None:
+            self.notification_queue.stop()
+        close_connections()
+        self.state_store.close()
+        if self.history is not None:
+            self.history.close()
+        if self.profiler.active:
+            self.profiler.report()
+            self.profiler.stop()
+        self.stop_logging()
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor websites for content changes")
+    parser.add_argument("--config", default="config.json", help="path to the configuration file")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes to split the sites across")
+    parser.add_argument("--shard-index", type=int, default=0, help="index of this host when splitting sites across hosts")
+    parser.add_argument("--shard-count", type=int, default=1, help="number of hosts the sites are split across")
+    parser.add_argument("--trace-memory", action="store_true", help="trace allocations per check phase and write a report on exit")
+    args = parser.parse_args()
+    
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+    
+    if args.workers > 1:
+        ShardCoordinator(args.config, args.workers, args.shard_index, args.shard_count, args.trace_memory).run()
+    else:
+        monitor = WebsiteMonitor(args.config, shards=[(args.shard_index, args.shard_count)], trace_memory=args.trace_memory)
+        monitor.run()
 
 if __name__ == "__main__":
-    monitor = WebsiteMonitor()
-    monitor.run()
\ No newline at end of file
+    main()
\ No newline at end of file